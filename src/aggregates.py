@@ -0,0 +1,163 @@
+import copy
+import os
+import numpy as np
+import pandas as pd
+
+# Distinct order ids are counted exactly up to this many, then estimated
+ORDER_ID_LIMIT = int(os.environ.get("SUPERMART_ORDER_ID_LIMIT", 20_000_000))
+
+HLL_PRECISION = 14
+HLL_REGISTERS = 1 << HLL_PRECISION
+
+
+def _plain(index):
+    # Plain labels so batches with grown category dictionaries still align
+    if isinstance(index, pd.MultiIndex):
+        return pd.MultiIndex.from_arrays(
+            [_plain(index.get_level_values(i)) for i in range(index.nlevels)], names=index.names
+        )
+    if isinstance(index, pd.CategoricalIndex):
+        return index.astype(str)
+    return index
+
+
+def _add(running, part):
+    part.index = _plain(part.index)
+    if running is None:
+        return part
+    return running.add(part, fill_value=0)
+
+
+def order_hashes(ids):
+    return np.unique(pd.util.hash_array(np.asarray(ids)))
+
+
+def hll_update(registers, hashes):
+    # HyperLogLog: leading bits pick the register, the rank of the rest is kept
+    width = 64 - HLL_PRECISION
+    index = (hashes >> np.uint64(width)).astype(np.intp)
+    rest = (hashes & np.uint64((1 << width) - 1)).astype(np.float64)  # < 2**50, exact as float
+    rank = np.where(rest > 0, width - np.floor(np.log2(np.maximum(rest, 1))), width + 1).astype(np.uint8)
+    np.maximum.at(registers, index, rank)
+    return registers
+
+
+def hll_count(registers):
+    m = float(len(registers))
+    estimate = 0.7213 / (1 + 1.079 / m) * m * m / np.sum(np.exp2(-registers.astype(np.float64)))
+    zeros = int(np.count_nonzero(registers == 0))
+    if estimate <= 2.5 * m and zeros:
+        estimate = m * np.log(m / zeros)
+    return int(round(estimate))
+
+
+class SalesAggregates:
+    """Running totals behind the dashboards; new batches are added, never regrouped.
+
+    Every field is a sum (or a mergeable sketch), so the same object can be fed
+    one chunk of a file at a time and ends up identical to a single full pass.
+    """
+
+    def __init__(self, df=None, order_id_limit=ORDER_ID_LIMIT):
+        self.rows = 0
+        self.total_sales = 0.0
+        self.total_profit = 0.0
+        self.total_discount = 0.0
+        self.order_id_limit = order_id_limit
+        self._order_ids = np.empty(0, dtype=np.uint64)
+        self._order_batches = []
+        self._order_registers = np.zeros(HLL_REGISTERS, dtype=np.uint8)
+        self.daily_sales = None
+        self.monthly_sales = None
+        self.category_sales = None
+        self.city_sales = None
+        self.region_sales = None
+        self.sub_category_sales = None
+        self.discount_sales = None
+        self.category_sub_sales = None
+        self.category_sub_monthly = None
+        self.category_sub_monthly_discount = None
+        self.category_sub_monthly_rows = None
+        self.series_monthly = None
+        if df is not None:
+            self.update(df)
+
+    def update(self, df):
+        # df needs 'Order Date' as datetimes (use store.view()). Measures are summed
+        # in float64, so compact mode's float32 columns give the same totals
+        df = df.astype({"Sales": np.float64, "Profit": np.float64, "Discount": np.float64})
+        self.rows += len(df)
+        self.total_sales += float(df["Sales"].sum())
+        self.total_profit += float(df["Profit"].sum())
+        self.total_discount += float(df["Discount"].sum())
+        self._add_orders(df["Order ID"])
+
+        month = (df["Order Date"].dt.to_period("M").dt.to_timestamp() + pd.offsets.MonthEnd(0)).rename("Month")
+        self.daily_sales = _add(self.daily_sales, df.groupby("Order Date")["Sales"].sum())
+        self.monthly_sales = _add(self.monthly_sales, df.groupby(month)["Sales"].sum())
+        self.category_sales = _add(self.category_sales, df.groupby("Category", observed=True)["Sales"].sum())
+        self.city_sales = _add(self.city_sales, df.groupby("City", observed=True)["Sales"].sum())
+        self.region_sales = _add(self.region_sales, df.groupby("Region", observed=True)["Sales"].sum())
+        self.sub_category_sales = _add(self.sub_category_sales, df.groupby("Sub Category", observed=True)["Sales"].sum())
+        self.discount_sales = _add(self.discount_sales, df.groupby("Discount")["Sales"].sum())
+        self.category_sub_sales = _add(
+            self.category_sub_sales, df.groupby(["Category", "Sub Category"], observed=True)["Sales"].sum()
+        )
+        by_series_month = df.groupby([df["Category"], df["Sub Category"], month], observed=True)
+        self.category_sub_monthly = _add(self.category_sub_monthly, by_series_month["Sales"].sum())
+        # Discount sum and row count, so the demand model can use the monthly mean discount
+        self.category_sub_monthly_discount = _add(self.category_sub_monthly_discount, by_series_month["Discount"].sum())
+        self.category_sub_monthly_rows = _add(self.category_sub_monthly_rows, by_series_month.size())
+        # Per (Category, Sub Category, City) series behind the forecast API
+        self.series_monthly = _add(
+            self.series_monthly,
+            df.groupby([df["Category"], df["Sub Category"], df["City"], month], observed=True)["Sales"].sum(),
+        )
+        return self
+
+    def copy(self):
+        # The running series are replaced on update, never changed in place;
+        # only the order-id sketch and batch list need their own copies
+        other = copy.copy(self)
+        other._order_registers = self._order_registers.copy()
+        other._order_batches = list(self._order_batches)
+        return other
+
+    def _add_orders(self, ids):
+        hashes = order_hashes(ids)
+        hll_update(self._order_registers, hashes)
+        if self._order_ids is None:
+            return
+        self._order_batches.append(hashes)
+        if sum(map(len, self._order_batches)) > max(len(self._order_ids), 1_000_000):
+            self._merge_orders()
+
+    def _merge_orders(self):
+        if self._order_ids is None or not self._order_batches:
+            return
+        self._order_ids = np.unique(np.concatenate([self._order_ids] + self._order_batches))
+        self._order_batches = []
+        if len(self._order_ids) > self.order_id_limit:
+            # Too many to hold exactly; the sketch carries on in a fixed 16 KB
+            self._order_ids = None
+
+    @property
+    def orders_exact(self):
+        self._merge_orders()
+        return self._order_ids is not None
+
+    @property
+    def total_orders(self):
+        self._merge_orders()
+        if self._order_ids is None:
+            return hll_count(self._order_registers)
+        return len(self._order_ids)
+
+    @property
+    def avg_discount(self):
+        return self.total_discount / self.rows if self.rows else float("nan")
+
+    def frame(self, name):
+        # e.g. frame("category_sales") -> Category | Sales
+        series = getattr(self, name)
+        return series.sort_index().rename("Sales").reset_index()
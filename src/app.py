@@ -1,30 +1,175 @@
 from functools import wraps
-from dashboard import create_dash_app as create_dashboard_app
-from sales_analysis import create_dash_app as create_sales_analysis_app
-from customer_insights import create_dash_app as create_customer_insights_app
-from geo_forecast import create_dash_app as create_geo_forecast_app
-from category_predictions import create_dash_app as create_category_predictions_app
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from data_store import get_store
+from dash_mount import LazyDashMounts
+from callback_cache import callback_cache
+from jobs import job_queue, launch as launch_job_workers
+from model_registry import ModelUnavailable, live_models
+from ingest import FileIngestor, INGEST_DIR, csv_to_frame, drop_orders, records_to_frame
+from flask import Flask, Response, render_template, request, redirect, url_for, session, flash, jsonify, stream_with_context
 from flask_bcrypt import Bcrypt
-from pymongo import MongoClient
+from user_store import MONGO_DB, UserStore, UserStoreBusy, connect
+import importlib
 import os
+import threading
 
 app = Flask(__name__)
-app.secret_key = os.urandom(24)
+# Sessions must survive worker restarts and load balancing, so production sets
+# SECRET_KEY; the random fallback is only good for a single dev process
+app.secret_key = os.environ.get('SECRET_KEY') or os.urandom(24)
 bcrypt = Bcrypt(app)
 
-# MongoDB setup
-client = MongoClient("mongodb://localhost:27017/")
-db = client.product_demand_forecast
-users_collection = db.users
-
-
-# Mount Dash apps
-dashboard_app = create_dashboard_app(app)               # Mounted at /dashboard/
-sales_analysis_app = create_sales_analysis_app(app)     # Mounted at /sales/
-customer_insights_app = create_customer_insights_app(app)  # Mounted at /customer/
-geo_forecast_app = create_geo_forecast_app(app)         # Mounted at /geo_forecast/
-category_predictions_app = create_category_predictions_app(app)  # Mounted at /category/
+# MongoDB setup: pooled client; the unique email index is checked on first signup/login
+def connect_users():
+    # Called again in each forked worker: MongoClient pools are not fork-safe.
+    # MongoClient connects lazily, so an unreachable database does not block boot
+    global client, db, users_collection, user_store
+    client = connect()
+    db = client[MONGO_DB]
+    users_collection = db.users
+    user_store = UserStore(users_collection, bcrypt)
+
+
+connect_users()
+
+
+def dash_factory(module):
+    # The module (and its plotting/model stack) is imported on the first build,
+    # so a cold start only loads Flask and the login routes
+    def create_app(server, store=None):
+        return importlib.import_module(module).create_dash_app(server, store or get_store())
+    return create_app
+
+
+# Dash apps by mount prefix
+DASH_APPS = {
+    '/dashboard/': dash_factory('dashboard'),
+    '/sales/': dash_factory('sales_analysis'),
+    '/customer/': dash_factory('customer_insights'),
+    '/geo_forecast/': dash_factory('geo_forecast'),
+    '/category/': dash_factory('category_predictions'),
+}
+
+# eager: build everything before serving (old behaviour)
+# lazy:  build each Dash app on its first request
+# warm:  like lazy, but also build them in a background thread pool right away
+DASH_MOUNT_MODE = os.environ.get('DASH_MOUNT_MODE', 'warm')
+DASH_WARMUP_WORKERS = int(os.environ.get('DASH_WARMUP_WORKERS', 2))
+
+dash_mounts = LazyDashMounts(app.wsgi_app)
+if DASH_MOUNT_MODE == 'eager':
+    # Load the sales dataset once and share it with every Dash app
+    store = get_store()
+    for create_app in DASH_APPS.values():
+        create_app(app, store)
+else:
+    for prefix, create_app in DASH_APPS.items():
+        dash_mounts.register(prefix, lambda server, create_app=create_app: create_app(server, get_store()))
+    app.wsgi_app = dash_mounts
+    if DASH_MOUNT_MODE == 'warm':
+        dash_mounts.warm_up(DASH_WARMUP_WORKERS)
+
+
+# Readiness: which Dash apps are built and serving
+@app.route('/ready')
+def ready():
+    status = {'mode': DASH_MOUNT_MODE, 'apps': dash_mounts.status(), 'callback_cache': callback_cache.stats(),
+              'users': user_store.stats(), 'jobs': job_queue.stats(), 'models': live_models.status()}
+    return jsonify(status), (200 if dash_mounts.ready() or DASH_MOUNT_MODE == 'eager' else 503)
+
+# Order ingestion: stores push new rows here (JSON records or text/csv body).
+# With SUPERMART_INGEST_DIR set, pushes are dropped there and every worker's
+# ingestor picks them up; without it they only reach the worker that took the
+# request, so a preloaded server with several workers refuses them
+INGEST_TOKEN = os.environ.get('INGEST_TOKEN')
+WEB_WORKERS = int(os.environ.get('WEB_WORKERS', min(os.cpu_count() or 1, 8)))  # as in gunicorn.conf.py
+
+
+@app.route('/api/orders', methods=['POST'])
+def ingest_orders():
+    if INGEST_TOKEN and request.headers.get('X-Ingest-Token') != INGEST_TOKEN:
+        return jsonify({'error': 'Invalid ingest token.'}), 403
+    try:
+        if request.mimetype == 'text/csv':
+            batch = csv_to_frame(request.get_data(as_text=True))
+        else:
+            batch = records_to_frame(request.get_json(force=True))
+        store = get_store()
+        batch = store.validate(batch)
+        if INGEST_DIR:
+            return jsonify({'rows': drop_orders(batch), 'queued': True}), 202
+        if SERVER_PRELOAD and WEB_WORKERS > 1:
+            return jsonify({'error': 'Pushed orders would only reach one worker; set SUPERMART_INGEST_DIR.'}), 409
+        added = store.append(batch)
+    except (KeyError, ValueError) as exc:
+        return jsonify({'error': exc.args[0] if exc.args else str(exc)}), 400
+    return jsonify({'rows': added, 'version': store.version})
+
+
+# Forecasts for machines: many (category, sub-category, city, horizon) keys per call
+FORECAST_API_TOKEN = os.environ.get('FORECAST_API_TOKEN')
+
+
+@app.route('/api/forecast', methods=['GET', 'POST'])
+def forecast_api():
+    if FORECAST_API_TOKEN and request.headers.get('X-API-Token') != FORECAST_API_TOKEN:
+        return jsonify({'error': 'Invalid API token.'}), 403
+    from forecast_api import ARROW_MIME, answer, parse_keys, read_arrow, register
+    register(live_models)
+    try:
+        if request.method == 'GET':
+            keys = parse_keys({k: v if len(v) > 1 or k in ('category', 'sub_category') else v[0]
+                               for k, v in request.args.to_dict(flat=False).items() if k != 'format'})
+        elif request.mimetype == ARROW_MIME:
+            keys = read_arrow(request.get_data())
+        else:
+            keys = parse_keys(request.get_json(force=True))
+        arrow = request.args.get('format') == 'arrow' or request.accept_mimetypes.best == ARROW_MIME
+        body, mimetype = answer(keys, arrow)
+    except ModelUnavailable as exc:
+        return jsonify({'error': exc.args[0]}), 503, {'Retry-After': '60'}
+    except (KeyError, ValueError, TypeError) as exc:
+        return jsonify({'error': exc.args[0] if exc.args else str(exc)}), 400
+    return Response(body, mimetype=mimetype)
+
+
+# Bulk export: the response is generated chunk by chunk as the client reads it
+@app.route('/api/export/<name>')
+def export_table(name):
+    if FORECAST_API_TOKEN and request.headers.get('X-API-Token') != FORECAST_API_TOKEN:
+        return jsonify({'error': 'Invalid API token.'}), 403
+    # Every model's module is needed for the forecasts table, so only exports pay for importing them
+    from export import EXPORT_CHUNK_ROWS, FORMATS, TABLES, register_models, stream as export_stream
+    register_models(live_models)
+    fmt = request.args.get('format', 'csv')
+    if name not in TABLES:
+        return jsonify({'error': f"Unknown export {name!r}; choose from {', '.join(TABLES)}."}), 404
+    try:
+        body = export_stream(name, fmt, get_store(), live_models, request.args.get('chunk_rows', EXPORT_CHUNK_ROWS, type=int))
+    except ModelUnavailable as exc:
+        # Web processes never fit; the refit job fills the registry
+        live_models.request_refit()
+        return jsonify({'error': exc.args[0]}), 503, {'Retry-After': '60'}
+    except ValueError as exc:
+        return jsonify({'error': exc.args[0]}), 400
+    headers = {'Content-Disposition': f'attachment; filename="{name}.{fmt}"', 'X-Accel-Buffering': 'no'}
+    return Response(stream_with_context(body), mimetype=FORMATS[fmt], headers=headers)
+
+
+# Optionally pick up rows appended to files in SUPERMART_INGEST_DIR. Under the
+# preforking server (wsgi.py) threads do not survive the fork, so each worker
+# starts its own ingestor after forking and keeps its copy of the store current
+SERVER_PRELOAD = os.environ.get('SERVER_PRELOAD') == '1'
+
+
+def start_background():
+    # Reloads new forecasts from the registry; the refit itself runs once, in a job worker
+    live_models.start()
+    if INGEST_DIR:
+        threading.Thread(target=lambda: FileIngestor(get_store()).run(), name='order-ingest', daemon=True).start()
+
+
+if not SERVER_PRELOAD:
+    start_background()
 
 # Home route – Protected
 
@@ -55,21 +200,16 @@ def signup():
         password = request.form['password']
         role = request.form['role']
 
-        existing_user = users_collection.find_one({'email': email})
-        if existing_user:
+        # Cheap indexed check first so taken emails skip the bcrypt hash
+        try:
+            created = not user_store.exists(email) and user_store.create(name, email, password, role)
+        except UserStoreBusy as exc:
+            flash(str(exc), 'warning')
+            return redirect(url_for('signup'))
+        if not created:
             flash('Email already registered.', 'danger')
             return redirect(url_for('signup'))
 
-        hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
-
-        new_user = {
-            'name': name,
-            'email': email,
-            'password': hashed_password,
-            'role': role
-        }
-
-        users_collection.insert_one(new_user)
         flash('Registration successful. Please login.', 'success')
         return redirect(url_for('login'))
 
@@ -81,9 +221,13 @@ def login():
         email = request.form.get('email', '').lower().strip()
         password = request.form.get('password', '')
 
-        user = users_collection.find_one({'email': email})
+        try:
+            user = user_store.authenticate(email, password)
+        except UserStoreBusy as exc:
+            flash(str(exc), 'warning')
+            return render_template('login.html'), 503
 
-        if user and bcrypt.check_password_hash(user['password'], password):
+        if user:
             session['email'] = user['email']
             session['role'] = user['role']
             flash('Login successful.', 'success')
@@ -98,9 +242,14 @@ def login():
 
 @app.route('/logout')
 def logout():
+    if 'email' in session:
+        user_store.forget(session['email'])
     session.clear()
     flash('Logged out successfully.', 'info')
     return redirect(url_for('login'))
 
 if __name__ == '__main__':
+    # Background job workers (jobs.py); the debug reloader's child only serves requests
+    if os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        launch_job_workers()
     app.run(debug=True)
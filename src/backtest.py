@@ -0,0 +1,199 @@
+import argparse
+import hashlib
+import os
+import pickle
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from data_store import DATA_PATH, SalesDataStore
+from demand_model import XGB_PARAMS, can_continue, continue_training, forecast, head, series_matrix, train
+
+# Where the accuracy charts look for results, and where fitted folds are cached
+BACKTEST_RESULTS = os.environ.get(
+    "BACKTEST_RESULTS", os.path.join(os.path.dirname(DATA_PATH), "backtest_results.csv")
+)
+BACKTEST_CACHE = os.environ.get(
+    "BACKTEST_CACHE", os.path.join(os.path.dirname(DATA_PATH), "backtest_folds.pkl")
+)
+BACKTEST_WORKERS = int(os.environ.get("BACKTEST_WORKERS", os.cpu_count() or 1))
+
+HW_MODELS = {
+    # dashboard.py: total monthly sales
+    "Holt-Winters (trend + seasonal)": dict(trend="add", seasonal="add", seasonal_periods=12),
+    # category_predictions.py: monthly sales, seasonal only
+    "Holt-Winters (seasonal)": dict(seasonal="add", seasonal_periods=12, initialization_method="estimated"),
+}
+XGB_MODEL = "XGBoost"
+
+
+def fold_origins(n_months, min_train, horizon, step=1):
+    return list(range(min_train, n_months - horizon + 1, step))
+
+
+def errors(actual, predicted):
+    actual = np.asarray(actual, dtype=np.float64)
+    predicted = np.asarray(predicted, dtype=np.float64)
+    diff = predicted - actual
+    nonzero = actual != 0
+    return {
+        "mae": float(np.mean(np.abs(diff))),
+        "rmse": float(np.sqrt(np.mean(diff ** 2))),
+        "mape": float(np.mean(np.abs(diff[nonzero] / actual[nonzero])) * 100) if nonzero.any() else np.nan,
+    }
+
+
+def _fold_key(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        h.update(part.tobytes() if isinstance(part, np.ndarray) else repr(part).encode("utf-8"))
+    return h.hexdigest()
+
+
+def _hw_fold(params, train, actual):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            predicted = ExponentialSmoothing(train, **params).fit().forecast(len(actual))
+        except (ValueError, np.linalg.LinAlgError):
+            return {"mae": np.nan, "rmse": np.nan, "mape": np.nan}
+    return errors(actual, predicted)
+
+
+def _xgb_walk(params, matrix, codes, origins, horizon):
+    # Folds in time order, each continuing the previous fold's model exactly as the dashboard's refresh does
+    state, metrics = None, []
+    for origin in origins:
+        fold = head(matrix, origin)
+        if can_continue(state, fold, params):
+            booster = continue_training(state["booster"], fold, codes, params, state["trained_through"])
+            trained_through, warm_starts = origin, state["warm_starts"] + 1
+        else:
+            booster, trained_through = train(fold, codes, params)
+            warm_starts = 0
+        state = {"booster": booster, "params": params, "matrix": fold, "trained_through": trained_through,
+                 "warm_starts": warm_starts}
+        predicted = forecast(booster, fold, codes, horizon)
+        actual = matrix["sales"][:, origin:origin + horizon]
+        # One metrics row per (Category, Sub Category) series that had sold before the origin
+        metrics.extend(errors(actual[i], predicted[i]) for i in np.flatnonzero(matrix["first"] < origin))
+    return metrics
+
+
+def _run_task(task):
+    kind, args = task
+    return _hw_fold(*args) if kind == "hw" else _xgb_walk(*args)
+
+
+def hw_tasks(store, keys, horizon, min_train):
+    df = store.view(["Order Date", "Sales"] + list(keys))
+    month = df["Order Date"].dt.to_period("M").rename("Month")
+    series = {"Total": df.groupby(month)["Sales"].sum()}
+    if keys:
+        wide = df.groupby([df[k] for k in keys] + [month], observed=True)["Sales"].sum().unstack("Month", fill_value=0)
+        for name, row in wide.iterrows():
+            series[" / ".join(map(str, name if isinstance(name, tuple) else (name,)))] = row
+
+    tasks = []
+    for name, values in series.items():
+        values = values.sort_index()
+        full = pd.period_range(values.index.min(), values.index.max(), freq="M")
+        values = values.reindex(full, fill_value=0).to_numpy(dtype=np.float64)
+        for origin in fold_origins(len(values), min_train, horizon):
+            train, actual = values[:origin], values[origin:origin + horizon]
+            for model, params in HW_MODELS.items():
+                meta = {"model": model, "series": name, "origin": str(full[origin])}
+                key = _fold_key(model, params, train, actual)
+                tasks.append((key, [meta], ("hw", (params, train, actual))))
+    return tasks
+
+
+def xgb_tasks(store, horizon, min_train, params=XGB_PARAMS):
+    # The dashboard's demand model: one walk over every fold, since each fold warm-starts from the last
+    df = store.view(["Order Date", "Category", "Sub Category", "Sales", "Discount"])
+    month = df["Order Date"].dt.to_period("M").dt.to_timestamp().rename("YearMonth_dt")
+    grp = (df.groupby([df["Category"], df["Sub Category"], month], observed=True)
+           .agg(Sales=("Sales", "sum"), Discount=("Discount", "mean")).reset_index())
+    matrix = series_matrix(grp)
+    categories = matrix["series"].get_level_values(0).astype(str)
+    sub_categories = matrix["series"].get_level_values(1).astype(str)
+    codes = {"category": pd.factorize(categories, sort=True)[0], "sub_category": pd.factorize(sub_categories, sort=True)[0]}
+
+    origins = fold_origins(len(matrix["months"]), min_train, horizon)
+    names = categories + " / " + sub_categories
+    metas = [{"model": XGB_MODEL, "series": names[i], "origin": str(matrix["months"][origin].to_period("M"))}
+             for origin in origins for i in np.flatnonzero(matrix["first"] < origin)]
+    key = _fold_key(XGB_MODEL, params, matrix["sales"], matrix["discount"], origins, horizon)
+    return [(key, metas, ("xgb", (params, matrix, codes, origins, horizon)))]
+
+
+def run_backtest(store, keys=("Category",), horizon=3, min_train=24, workers=BACKTEST_WORKERS,
+                 cache_path=BACKTEST_CACHE, results_path=BACKTEST_RESULTS):
+    """Rolling-origin backtest of the dashboard models; writes one row per model/series/fold.
+
+    Folds whose training and test data are unchanged since the last run are
+    read from the fold cache instead of being refit.
+    """
+    cache = {}
+    if cache_path and os.path.exists(cache_path):
+        with open(cache_path, "rb") as f:
+            cache = pickle.load(f)
+
+    tasks = hw_tasks(store, keys, horizon, min_train) + xgb_tasks(store, horizon, min_train)
+    todo = [t for t in tasks if t[0] not in cache]
+    if todo:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_run_task, [t[2] for t in todo], chunksize=8))
+        else:
+            results = [_run_task(t[2]) for t in todo]
+        for (key, _, _), result in zip(todo, results):
+            cache[key] = result if isinstance(result, list) else [result]
+
+    rows = []
+    used = {}
+    for key, metas, _ in tasks:
+        used[key] = cache[key]
+        rows.extend({**meta, **metrics} for meta, metrics in zip(metas, cache[key]))
+    results = pd.DataFrame(rows)
+
+    if cache_path:
+        # Only keep folds that still exist, so the cache does not grow forever
+        with open(cache_path, "wb") as f:
+            pickle.dump(used, f, protocol=pickle.HIGHEST_PROTOCOL)
+    if results_path:
+        results.to_csv(results_path, index=False)
+    print(f"Backtest: {len(tasks)} folds, {len(todo)} refit, {len(tasks) - len(todo)} from cache")
+    return results
+
+
+def summarize(results):
+    return (
+        results.groupby("model")[["mape", "rmse", "mae"]].mean()
+        .rename(columns={"mape": "MAPE (%)", "rmse": "RMSE", "mae": "MAE"})
+        .rename_axis("Model").reset_index()
+    )
+
+
+def load_summary(path=BACKTEST_RESULTS):
+    # None until a backtest has been run
+    if not os.path.exists(path):
+        return None
+    return summarize(pd.read_csv(path))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rolling-origin backtest of the Holt-Winters and XGBoost models")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--keys", nargs="*", default=["Category"])
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--min-train", type=int, default=24)
+    parser.add_argument("--workers", type=int, default=BACKTEST_WORKERS)
+    parser.add_argument("--cache", default=BACKTEST_CACHE)
+    parser.add_argument("--out", default=BACKTEST_RESULTS)
+    args = parser.parse_args()
+
+    results = run_backtest(SalesDataStore(args.data), args.keys, args.horizon, args.min_train,
+                           args.workers, args.cache, args.out)
+    print(summarize(results).to_string(index=False))
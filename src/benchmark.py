@@ -0,0 +1,246 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+from generate_data import SupermartGenerator, write_csv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+SUB_APPS = {
+    "dashboard": "/dashboard/",
+    "sales_analysis": "/sales/",
+    "customer_insights": "/customer/",
+    "geo_forecast": "/geo_forecast/",
+    "category_predictions": "/category/",
+}
+
+# Filter combinations replayed against sales_analysis.update_dashboard
+SALES_FILTERS = [
+    (None, None, None, None, [0, 1]),
+    ("Beverages", None, None, None, [0, 1]),
+    ("Snacks", "Pune", None, None, [0, 1]),
+    (None, None, 2023, None, [0.1, 0.2]),
+    ("Bakery", None, 2022, 6, [0, 1]),
+    (None, "Kothrud", None, 12, [0.15, 0.3]),
+]
+
+
+def make_dataset(rows, path, seed=0):
+    # Synthetic data with the Supermart schema, streamed to disk
+    for _ in write_csv(SupermartGenerator(rows, seed), path):
+        pass
+    return path
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1000
+    return {"p50_ms": round(float(np.percentile(samples, 50)), 2),
+            "p99_ms": round(float(np.percentile(samples, 99)), 2),
+            "n": len(samples)}
+
+
+def post_callback(client, prefix, outputs, inputs):
+    outs = [{"id": i, "property": p} for i, p in outputs]
+    body = {
+        "output": ".." + "...".join(f"{i}.{p}" for i, p in outputs) + ".." if len(outputs) > 1 else f"{outputs[0][0]}.{outputs[0][1]}",
+        "outputs": outs if len(outputs) > 1 else outs[0],
+        "inputs": [{"id": i, "property": p, "value": v} for i, p, v in inputs],
+        "changedPropIds": [],
+    }
+    start = time.perf_counter()
+    response = client.post(prefix + "_dash-update-component", json=body)
+    return time.perf_counter() - start, response.status_code, len(response.data)
+
+
+def run_worker(rows, repeat):
+    """Measure one dataset size in this (fresh) process and return a result dict."""
+    from flask import Flask
+    result = {"rows": rows, "apps": {}, "callbacks": {}}
+
+    start = time.perf_counter()
+    from data_store import get_store
+    store = get_store()
+    result["store_load_s"] = round(time.perf_counter() - start, 3)
+    result["rss_after_load_mb"] = round(peak_rss_mb(), 1)
+
+    clients = {}
+    for module_name, prefix in SUB_APPS.items():
+        module = __import__(module_name)
+        server = Flask(module_name)
+        start = time.perf_counter()
+        module.create_dash_app(server, store)
+        build = time.perf_counter() - start
+        client = server.test_client()
+        start = time.perf_counter()
+        layout = client.get(prefix + "_dash-layout")
+        result["apps"][module_name] = {
+            "build_s": round(build, 3),
+            "layout_s": round(time.perf_counter() - start, 3),
+            "layout_bytes": len(layout.data),
+            "layout_gzip_bytes": len(client.get(prefix + "_dash-layout", headers={"Accept-Encoding": "gzip"}).data),
+            "status": layout.status_code,
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+        clients[prefix] = client
+
+    timings, sizes = [], []
+    for _ in range(repeat):
+        for category, city, year, month, discount in SALES_FILTERS:
+            elapsed, _, size = post_callback(clients["/sales/"], "/sales/", [("filtered-content", "children")], [
+                ("category-filter", "value", category), ("city-filter", "value", city),
+                ("year-filter", "value", year), ("month-filter", "value", month),
+                ("discount-filter", "value", discount),
+            ])
+            timings.append(elapsed)
+            sizes.append(size)
+    result["callbacks"]["sales_analysis.update_dashboard"] = {**percentiles(timings), "max_bytes": max(sizes)}
+
+    pairs = store.view(["Category", "Sub Category"]).drop_duplicates().astype(str).head(10).values.tolist()
+    timings, sizes = [], []
+    for _ in range(repeat):
+        for category, sub in pairs:
+            elapsed, _, size = post_callback(clients["/category/"], "/category/",
+                                             [("xgb-graph", "figure"), ("notify", "children")],
+                                             [("cat-dd", "value", category), ("sub-dd", "value", sub)])
+            timings.append(elapsed)
+            sizes.append(size)
+    result["callbacks"]["category_predictions.update_xgb"] = {**percentiles(timings), "max_bytes": max(sizes)}
+
+    result["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def measure_boot(env):
+    # Time to import app.py and answer /login in a fresh process
+    code = (
+        "import time; t = time.perf_counter(); import app; "
+        "r = app.app.test_client().get('/login'); "
+        "print(round(time.perf_counter() - t, 3), r.status_code)"
+    )
+    # In-memory users, so a missing local MongoDB is not timed as boot
+    env = dict(env, MONGO_URI="mongomock://")
+    out = subprocess.run([sys.executable, "-c", code], cwd=HERE, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": out.stderr.strip().splitlines()[-1] if out.stderr else "failed"}
+    seconds, status = out.stdout.split()[-2:]
+    return {"login_ready_s": float(seconds), "status": int(status)}
+
+
+def run_login_worker(users, logins, concurrency):
+    """Login latency through the Flask app against an in-memory user store."""
+    from concurrent.futures import ThreadPoolExecutor
+    import app
+
+    client = app.app.test_client()
+    for i in range(users):
+        client.post("/signup", data={"name": f"user{i}", "email": f"user{i}@example.com",
+                                     "password": "secret", "role": "analyst"})
+
+    def login(i):
+        start = time.perf_counter()
+        response = app.app.test_client().post("/login", data={"email": f"user{i % users}@example.com",
+                                                               "password": "secret"})
+        return time.perf_counter() - start, response.status_code
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(login, range(logins)))
+    return {"users": users, "concurrency": concurrency, **percentiles([t for t, _ in samples]),
+            "errors": sum(status != 200 for _, status in samples), "store": app.user_store.stats()}
+
+
+def measure_logins(env, users=50, logins=500, concurrency=16):
+    env = dict(env, MONGO_URI="mongomock://")
+    out = subprocess.run([sys.executable, __file__, "--login-worker", str(users), str(logins), str(concurrency)],
+                         cwd=HERE, env=env, capture_output=True, text=True)
+    if out.returncode != 0:
+        return {"error": out.stderr.strip().splitlines()[-1] if out.stderr else "failed"}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat, cached=False, data=None):
+    results = {"commit": git_commit(), "python": platform.python_version(),
+               "machine": platform.machine(), "cpus": os.cpu_count(), "runs": []}
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in sizes:
+            path = data or make_dataset(rows, os.path.join(tmp, f"supermart_{rows}.csv"))
+            env = dict(os.environ, SUPERMART_DATA=path, DASH_MOUNT_MODE="lazy")
+            if not cached:
+                env["CALLBACK_CACHE_SIZE"] = "0"
+                env.pop("CALLBACK_CACHE_DIR", None)
+            out = subprocess.run([sys.executable, __file__, "--worker", str(rows), "--repeat", str(repeat)],
+                                 cwd=HERE, env=env, capture_output=True, text=True)
+            if out.returncode != 0:
+                raise RuntimeError(out.stderr)
+            run_result = json.loads(out.stdout.strip().splitlines()[-1])
+            run_result["boot"] = measure_boot(env)
+            run_result["login"] = measure_logins(env)
+            results["runs"].append(run_result)
+            print(f"{rows:>10} rows: load {run_result['store_load_s']}s, peak RSS {run_result['peak_rss_mb']} MB",
+                  file=sys.stderr)
+    return results
+
+
+def compare(old_path, new_path, threshold=0.2):
+    # Print metrics that got more than `threshold` worse between two result files
+    with open(old_path) as f:
+        old = {r["rows"]: r for r in json.load(f)["runs"]}
+    with open(new_path) as f:
+        new = {r["rows"]: r for r in json.load(f)["runs"]}
+
+    def flat(run, prefix=""):
+        for key, value in run.items():
+            if isinstance(value, dict):
+                yield from flat(value, f"{prefix}{key}.")
+            elif isinstance(value, (int, float)) and key not in ("rows", "n", "status"):
+                yield f"{prefix}{key}", value
+
+    regressions = 0
+    for rows in sorted(old.keys() & new.keys()):
+        before = dict(flat(old[rows]))
+        for name, after in flat(new[rows]):
+            if name in before and before[name] and after / before[name] - 1 > threshold:
+                regressions += 1
+                print(f"{rows} rows  {name}: {before[name]} -> {after} (+{after / before[name] - 1:.0%})")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark startup, callback latency and memory of the Dash sub-apps")
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--data", help="Benchmark this CSV instead of a generated one")
+    parser.add_argument("--cached", action="store_true", help="Keep the callback cache enabled")
+    parser.add_argument("--out", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"))
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--login-worker", type=int, nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker is not None:
+        print(json.dumps(run_worker(args.worker, args.repeat)))
+    elif args.login_worker:
+        print(json.dumps(run_login_worker(*args.login_worker)))
+    elif args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+    else:
+        results = run(args.rows, args.repeat, args.cached, args.data)
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Wrote {args.out}")
@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+# Size/TTL of the in-process LRU, and an optional directory for a SQLite file
+# that all gunicorn workers on the box share
+CACHE_SIZE = int(os.environ.get("CALLBACK_CACHE_SIZE", 512))
+CACHE_TTL = float(os.environ.get("CALLBACK_CACHE_TTL", 3600))
+CACHE_DIR = os.environ.get("CALLBACK_CACHE_DIR")
+
+
+class SQLiteBackend:
+    """Shared on-disk cache; safe to open from several processes."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS callback_cache "
+                "(key TEXT PRIMARY KEY, version TEXT, created REAL, value BLOB)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, key, ttl):
+        with self._connect() as conn:
+            row = conn.execute("SELECT created, value FROM callback_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or time.time() - row[0] > ttl:
+            return None
+        return pickle.loads(row[1])
+
+    def set(self, key, version, value, ttl):
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO callback_cache VALUES (?, ?, ?, ?)",
+                (key, str(version), now, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)),
+            )
+            # Entries of older data versions are never asked for again; they just expire
+            conn.execute("DELETE FROM callback_cache WHERE created < ?", (now - ttl,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM callback_cache")
+
+
+class CallbackCache:
+    """Memoizes pure Dash callbacks on their inputs plus the dataset version.
+
+    The version is part of every key, so callbacks with different version
+    shapes never invalidate each other; entries of old versions fall out of
+    the LRU (and the shared tier's TTL). When the shared tier is used, the
+    version must be derived from content (store.data_version, model keys),
+    never from a per-process counter.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL, backend=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls):
+        backend = None
+        if CACHE_DIR:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            backend = SQLiteBackend(os.path.join(CACHE_DIR, "callbacks.sqlite"))
+        return cls(CACHE_SIZE, CACHE_TTL, backend)
+
+    @staticmethod
+    def make_key(name, version, args, kwargs):
+        payload = json.dumps([name, version, args, kwargs], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if time.time() - created <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+        if self.backend is not None:
+            value = self.backend.get(key, self.ttl)
+            if value is not None:
+                self._store_local(key, value)
+                with self._lock:
+                    self.hits += 1
+                return True, value
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def _store_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.time(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def set(self, key, value, version=None):
+        self._store_local(key, value)
+        if self.backend is not None:
+            self.backend.set(key, version, value, self.ttl)
+
+    def memoize(self, version=lambda: None):
+        # version() returns the current data version, e.g. lambda: store.data_version
+        def decorator(func):
+            name = f"{func.__module__}.{func.__qualname__}"
+
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                current = version()
+                key = self.make_key(name, current, args, kwargs)
+                found, value = self.get(key)
+                if found:
+                    return value
+                value = func(*args, **kwargs)
+                self.set(key, value, current)
+                return value
+
+            return wrapper
+        return decorator
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "shared": self.backend is not None,
+        }
+
+
+# One cache shared by every Dash app in the process
+callback_cache = CallbackCache.from_env()
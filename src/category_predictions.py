@@ -1,189 +1,280 @@
+import numpy as np
 import pandas as pd
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, ctx, no_update
 import plotly.express as px
 import plotly.graph_objects as go
 from flask import Flask
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 from xgboost import XGBRegressor
 from sklearn.preprocessing import LabelEncoder
+from demand_model import (XGB_PARAMS, can_continue, continue_training, forecast as forecast_demand, month_ordinal,
+                          series_matrix, train)
+from layout_cache import cache_layout
+from data_store import SalesDataStore, get_store
+from callback_cache import callback_cache
+from jobs import ACTIVE, DONE, job_queue
+from model_registry import MODEL_REFRESHING, ModelUnavailable, live_models
 
-def create_dash_app(server: Flask):
-    # Load & preprocess data
-    df = pd.read_csv(r"C:\Users\vaish\Project phase I\Supermart Grocery Sales - Retail Analytics Dataset.csv")
-    df['Order Date'] = pd.to_datetime(df['Order Date'], dayfirst=True, errors='coerce')
-    df = df.dropna(subset=['Order Date'])
-
-    # KPIs
-    total_sales = df['Sales'].sum()
-    total_profit = df['Profit'].sum()
-    avg_discount = df['Discount'].mean()
-
-    # Holt‑Winters Forecast
-    df['YearMonth'] = df['Order Date'].dt.to_period('M').astype(str)
-    monthly_sales = df.groupby('YearMonth')['Sales'].sum().reset_index()
-    monthly_sales['YearMonth_dt'] = pd.to_datetime(monthly_sales['YearMonth'])
-    monthly_sales.sort_values('YearMonth_dt', inplace=True)
-    hw_model = ExponentialSmoothing(monthly_sales['Sales'], seasonal='add', seasonal_periods=12, initialization_method="estimated")
-    hw_fit = hw_model.fit()
+# Months ahead predicted by the product-level XGBoost model
+XGB_HORIZON = 3
+
+HW_PARAMS = dict(seasonal='add', seasonal_periods=12, initialization_method="estimated")
+
+# Trees grown by a background refit of a single series
+REFIT_ROUNDS = 400
+
+def refit_series(category, sub_category, months, sales, horizon=XGB_HORIZON, rounds=REFIT_ROUNDS, progress=None):
+    # Dedicated model for one series; runs in a job worker (jobs.py), not in the web process
+    dates = pd.to_datetime(pd.Series(months))
+    X = pd.DataFrame({'Month_Ordinal': month_ordinal(dates), 'Month': dates.dt.month})
+    y = np.asarray(sales, dtype=np.float64)
+    future = pd.Series(pd.date_range(dates.max() + pd.DateOffset(months=1), periods=horizon, freq='MS'))
+    X_future = pd.DataFrame({'Month_Ordinal': month_ordinal(future), 'Month': future.dt.month})
+
+    # Grown in steps so progress is reported and cancellation is honoured in between
+    model, step = None, max(rounds // 10, 1)
+    for done in range(step, rounds + 1, step):
+        model = XGBRegressor(n_estimators=step).fit(X, y, xgb_model=model.get_booster() if model else None)
+        if progress:
+            progress(done / rounds, f"{done}/{rounds} trees")
+    return {'Month': future.dt.strftime('%Y-%m-%d').tolist(), 'Predicted_Sales': model.predict(X_future).tolist()}
+
+
+def monthly_sales_frame(aggregates):
+    monthly_sales = aggregates.frame('monthly_sales')
+    monthly_sales['YearMonth_dt'] = monthly_sales.pop('Month').dt.to_period('M').dt.to_timestamp()
+    monthly_sales['YearMonth'] = monthly_sales['YearMonth_dt'].dt.strftime('%Y-%m')
+    return monthly_sales
+
+
+def fit_hw_forecast(monthly_sales, **params):
+    hw_fit = ExponentialSmoothing(monthly_sales['Sales'], **params).fit()
     hw_forecast = hw_fit.forecast(3)
     hw_df = pd.DataFrame({
         'Month': pd.date_range(monthly_sales['YearMonth_dt'].iloc[-1] + pd.DateOffset(months=1), periods=3, freq='ME'),
-        'Forecasted Sales': hw_forecast
+        'Forecasted Sales': hw_forecast.to_numpy()
     })
+    return hw_fit, hw_df
+
+
+def series_frame(aggregates):
+    # Monthly sales and mean discount per (Category, Sub Category)
+    grp = aggregates.frame('category_sub_monthly')
+    discount = aggregates.category_sub_monthly_discount / aggregates.category_sub_monthly_rows
+    grp['Discount'] = discount.reindex(pd.MultiIndex.from_frame(grp[['Category', 'Sub Category', 'Month']])).to_numpy()
+    grp['YearMonth_dt'] = grp.pop('Month').dt.to_period('M').dt.to_timestamp()
+    grp['YearMonth'] = grp['YearMonth_dt'].dt.strftime('%Y-%m')
+    grp['Month_Ordinal'] = month_ordinal(grp['YearMonth_dt'])
+    return grp
+
+
+def fit_xgb_forecast(grp, previous=None, **params):
+    # previous: the last registry artifact for this model, continued when only new months arrived
+    matrix = series_matrix(grp)
+    state = previous['model'] if previous else None
+    warm = can_continue(state, matrix, params)
+    if warm:
+        le_cat, le_sub = state['le_cat'], state['le_sub']
+    else:
+        le_cat = LabelEncoder().fit(matrix['series'].get_level_values(0).astype(str))
+        le_sub = LabelEncoder().fit(matrix['series'].get_level_values(1).astype(str))
+    codes = {'category': le_cat.transform(matrix['series'].get_level_values(0).astype(str)),
+             'sub_category': le_sub.transform(matrix['series'].get_level_values(1).astype(str))}
 
-    # Regional / Category / Sub‑category Sales
-    regional_sales = df.groupby('Region')['Sales'].sum().reset_index()
-    category_sales = df.groupby('Category')['Sales'].sum().reset_index()
-    subcat_sales = df.groupby(['Category','Sub Category'])['Sales'].sum().reset_index()
-
-    # XGBoost product‑level forecast prep
-    df_fc = df.copy()
-    df_fc['YearMonth'] = df_fc['Order Date'].dt.to_period('M').astype(str)
-    grp = df_fc.groupby(['Category','Sub Category','YearMonth'])['Sales'].sum().reset_index()
-    grp['YearMonth_dt'] = pd.to_datetime(grp['YearMonth'])
-    grp['Month_Ordinal'] = grp['YearMonth_dt'].map(lambda x: x.toordinal())
-
-    le_cat = LabelEncoder().fit(grp['Category'])
-    le_sub = LabelEncoder().fit(grp['Sub Category'])
-    grp['Category_enc'] = le_cat.transform(grp['Category'])
-    grp['Sub_enc']      = le_sub.transform(grp['Sub Category'])
-
-    X = grp[['Category_enc','Sub_enc','Month_Ordinal']]
-    y = grp['Sales']
-    xgb = XGBRegressor(n_estimators=100).fit(X,y)
-
-    last = grp['YearMonth_dt'].max()
-    future_months = [last + pd.DateOffset(months=i) for i in range(1,4)]
-    rows=[]
-    for c in grp['Category'].unique():
-        for s in grp[grp['Category']==c]['Sub Category'].unique():
-            for m in future_months:
-                rows.append({
-                    'Category':c,'Sub Category':s,
-                    'Category_enc':le_cat.transform([c])[0],
-                    'Sub_enc':le_sub.transform([s])[0],
-                    'Month_Ordinal':m.toordinal(),
-                    'YearMonth_dt':m
-                })
-    future_df = pd.DataFrame(rows)
-    future_df['Predicted_Sales'] = xgb.predict(future_df[['Category_enc','Sub_enc','Month_Ordinal']])
+    if warm:
+        booster = continue_training(state['booster'], matrix, codes, params, state['trained_through'])
+        trained_through, warm_starts = len(matrix['months']), state['warm_starts'] + 1
+    else:
+        booster, trained_through = train(matrix, codes, params)
+        warm_starts = 0
+
+    # One recursive pass predicts every series at once
+    predicted = forecast_demand(booster, matrix, codes, XGB_HORIZON)
+    months = pd.date_range(matrix['months'][-1] + pd.DateOffset(months=1), periods=XGB_HORIZON, freq='MS')
+    n = len(matrix['series'])
+    future_df = pd.DataFrame({
+        'Category': np.repeat(matrix['series'].get_level_values(0).to_numpy(), XGB_HORIZON),
+        'Sub Category': np.repeat(matrix['series'].get_level_values(1).to_numpy(), XGB_HORIZON),
+        'YearMonth_dt': np.tile(months.to_numpy(), n),
+        'Predicted_Sales': predicted.ravel(),
+    })
+    state = {'booster': booster, 'le_cat': le_cat, 'le_sub': le_sub, 'params': params, 'matrix': matrix,
+             'trained_through': trained_through, 'warm_starts': warm_starts}
+    return state, future_df
+
+
+def create_dash_app(server: Flask, store: SalesDataStore = None):
+    # Running aggregates from the shared store (also built chunk by chunk in streaming mode)
+    store = store or get_store()
+
+    # Models come from the registry: fitted once per data version, refreshed in the background
+    live_models.register('category_hw', monthly_sales_frame, fit_hw_forecast, HW_PARAMS, store)
+    live_models.register('category_xgb', series_frame, fit_xgb_forecast, XGB_PARAMS, store, warm_start=True)
+
+    # Series for the product‑level dropdowns, rebuilt when new orders bump the data version
+    series_frames = {}
+
+    def series_grp():
+        version = store.version
+        if version not in series_frames:
+            series_frames.clear()
+            series_frames[version] = series_frame(store.aggregates)
+        return series_frames[version]
 
     # Build Dash
     app = dash.Dash(__name__, server=server, url_base_pathname='/category/')
 
-    app.layout = html.Div([
-        html.H1("Category-Wise Sales Dashboard", style={'textAlign':'center'}),
+    def build_layout():
+        # Running aggregates, kept up to date as new orders are ingested
+        aggregates = store.aggregates
+        grp = series_grp()
 
         # KPIs
-       html.Div([
-    html.Div([
-        html.H4("Total Sales", style={
-            "fontSize": "1rem",
-            "color": "#343a40",
-            "fontWeight": "500",
-            "marginBottom": "8px"
-        }),
-        html.P(f"₹{total_sales:,.0f}", style={
-            "fontSize": "1.5rem",
-            "color": "#007bff",
-            "fontWeight": "600",
-            "margin": "0"
-        })
-    ], style={
-        "background": "#ffffff",
-        "borderRadius": "6px",
-        "padding": "16px",
-        "boxShadow": "0 2px 6px rgba(0,0,0,0.05)",
-        "textAlign": "center",
-        "transition": "transform 0.2s ease, box-shadow 0.2s ease"
-    }),
-
-    html.Div([
-        html.H4("Total Profit", style={
-            "fontSize": "1rem",
-            "color": "#343a40",
-            "fontWeight": "500",
-            "marginBottom": "8px"
+        total_sales = aggregates.total_sales
+        total_profit = aggregates.total_profit
+        avg_discount = aggregates.avg_discount
+
+        # Regional / Category / Sub‑category Sales
+        regional_sales = aggregates.frame('region_sales')
+        category_sales = aggregates.frame('category_sales')
+        subcat_sales = aggregates.frame('category_sub_sales')
+
+        # Latest Holt‑Winters forecast from the model registry
+        hw_df = live_models.forecast_or_refit('category_hw')
+        hw_title = "HW Forecast Next 3 Months"
+        if hw_df is None:
+            hw_df, hw_title = pd.DataFrame({'Month': [], 'Forecasted Sales': []}), f"{hw_title} ({MODEL_REFRESHING})"
+
+        return html.Div([
+            html.H1("Category-Wise Sales Dashboard", style={'textAlign':'center'}),
+
+            # KPIs
+           html.Div([
+        html.Div([
+            html.H4("Total Sales", style={
+                "fontSize": "1rem",
+                "color": "#343a40",
+                "fontWeight": "500",
+                "marginBottom": "8px"
+            }),
+            html.P(f"₹{total_sales:,.0f}", style={
+                "fontSize": "1.5rem",
+                "color": "#007bff",
+                "fontWeight": "600",
+                "margin": "0"
+            })
+        ], style={
+            "background": "#ffffff",
+            "borderRadius": "6px",
+            "padding": "16px",
+            "boxShadow": "0 2px 6px rgba(0,0,0,0.05)",
+            "textAlign": "center",
+            "transition": "transform 0.2s ease, box-shadow 0.2s ease"
         }),
-        html.P(f"₹{total_profit:,.0f}", style={
-            "fontSize": "1.5rem",
-            "color": "#007bff",
-            "fontWeight": "600",
-            "margin": "0"
-        })
-    ], style={
-        "background": "#ffffff",
-        "borderRadius": "6px",
-        "padding": "16px",
-        "boxShadow": "0 2px 6px rgba(0,0,0,0.05)",
-        "textAlign": "center",
-        "transition": "transform 0.2s ease, box-shadow 0.2s ease"
-    }),
-
-    html.Div([
-        html.H4("Avg Discount", style={
-            "fontSize": "1rem",
-            "color": "#343a40",
-            "fontWeight": "500",
-            "marginBottom": "8px"
+
+        html.Div([
+            html.H4("Total Profit", style={
+                "fontSize": "1rem",
+                "color": "#343a40",
+                "fontWeight": "500",
+                "marginBottom": "8px"
+            }),
+            html.P(f"₹{total_profit:,.0f}", style={
+                "fontSize": "1.5rem",
+                "color": "#007bff",
+                "fontWeight": "600",
+                "margin": "0"
+            })
+        ], style={
+            "background": "#ffffff",
+            "borderRadius": "6px",
+            "padding": "16px",
+            "boxShadow": "0 2px 6px rgba(0,0,0,0.05)",
+            "textAlign": "center",
+            "transition": "transform 0.2s ease, box-shadow 0.2s ease"
         }),
-        html.P(f"{avg_discount:.2%}", style={
-            "fontSize": "1.5rem",
-            "color": "#007bff",
-            "fontWeight": "600",
-            "margin": "0"
+
+        html.Div([
+            html.H4("Avg Discount", style={
+                "fontSize": "1rem",
+                "color": "#343a40",
+                "fontWeight": "500",
+                "marginBottom": "8px"
+            }),
+            html.P(f"{avg_discount:.2%}", style={
+                "fontSize": "1.5rem",
+                "color": "#007bff",
+                "fontWeight": "600",
+                "margin": "0"
+            })
+        ], style={
+            "background": "#ffffff",
+            "borderRadius": "6px",
+            "padding": "16px",
+            "boxShadow": "0 2px 6px rgba(0,0,0,0.05)",
+            "textAlign": "center",
+            "transition": "transform 0.2s ease, box-shadow 0.2s ease"
         })
     ], style={
-        "background": "#ffffff",
-        "borderRadius": "6px",
-        "padding": "16px",
-        "boxShadow": "0 2px 6px rgba(0,0,0,0.05)",
-        "textAlign": "center",
-        "transition": "transform 0.2s ease, box-shadow 0.2s ease"
+        "display": "grid",
+        "gridTemplateColumns": "repeat(auto-fit, minmax(240px, 1fr))",
+        "gap": "16px",
+        "marginBottom": "32px"
     })
-], style={
-    "display": "grid",
-    "gridTemplateColumns": "repeat(auto-fit, minmax(240px, 1fr))",
-    "gap": "16px",
-    "marginBottom": "32px"
-})
-,
-
-        # Regional & Category charts
-        html.Div([
-            dcc.Graph(figure=px.pie(category_sales, names='Category', values='Sales', title="Category Sales")),
-            dcc.Graph(figure=px.sunburst(subcat_sales, path=['Category','Sub Category'], values='Sales', title="Category > Sub-Category")),
+    ,
 
-        ], style={'display':'flex'}),
+            # Regional & Category charts
+            html.Div([
+                dcc.Graph(figure=px.pie(category_sales, names='Category', values='Sales', title="Category Sales")),
+                dcc.Graph(figure=px.sunburst(subcat_sales, path=['Category','Sub Category'], values='Sales', title="Category > Sub-Category")),
 
-        # Sub‑category sunburst
+            ], style={'display':'flex'}),
 
-        # Holt‑Winters forecast
-        dcc.Graph(figure=px.line(hw_df, x='Month', y='Forecasted Sales', markers=True, title="HW Forecast Next 3 Months")),
+            # Sub‑category sunburst
 
-        # Product‑level forecast
-        html.Div([
-            html.Label("Select Category:"),
-            dcc.Dropdown(id='cat-dd', options=[{'label':c,'value':c} for c in grp['Category'].unique()]),
-            html.Label("Select Sub-Category:"),
-            dcc.Dropdown(id='sub-dd', disabled=True),
-            dcc.Graph(id='xgb-graph'),
-            html.Div(id='notify', style={'fontWeight':'bold','marginTop':'10px'})
-        ], style={'border':'1px solid #ccc','padding':'10px','marginTop':'20px'})
-    ])
+            # Holt‑Winters forecast
+            dcc.Graph(figure=px.line(hw_df, x='Month', y='Forecasted Sales', markers=True, title=hw_title)),
+
+            # Product‑level forecast
+            html.Div([
+                html.Label("Select Category:"),
+                dcc.Dropdown(id='cat-dd', options=[{'label':c,'value':c} for c in grp['Category'].unique()]),
+                html.Label("Select Sub-Category:"),
+                dcc.Dropdown(id='sub-dd', disabled=True),
+                dcc.Graph(id='xgb-graph'),
+                html.Div(id='notify', style={'fontWeight':'bold','marginTop':'10px'}),
+                html.Button("Refit this series", id='refit-btn', style={'marginTop':'10px'}),
+                html.Button("Cancel", id='refit-cancel', style={'marginTop':'10px','marginLeft':'8px'}),
+                html.Div(id='refit-status', style={'marginTop':'10px'}),
+                dcc.Store(id='refit-job'),
+                dcc.Interval(id='refit-poll', interval=1000, disabled=True)
+            ], style={'border':'1px solid #ccc','padding':'10px','marginTop':'20px'})
+        ])
+
+    # Rebuilt only when new orders arrive or the model registry swaps in new forecasts
+    cache_layout(app, version=lambda: (store.version, live_models.version), build=build_layout)
 
     # enable & populate sub‑dropdown
     @app.callback(
         [Output('sub-dd','options'), Output('sub-dd','disabled')],
         Input('cat-dd','value')
     )
+    @callback_cache.memoize(version=lambda: store.data_version)
     def set_sub_options(cat):
         if not cat:
             return [], True
+        grp = series_grp()
         subs = grp[grp['Category']==cat]['Sub Category'].unique()
         return ([{'label':s,'value':s} for s in subs], False)
 
+    def xgb_key():
+        # Looked up on every call while missing, so the graph appears once the refit job lands
+        try:
+            return live_models.get('category_xgb')['key']
+        except ModelUnavailable:
+            return None
+
     # update XGB graph & notification
     @app.callback(
         Output('xgb-graph','figure'),
@@ -191,16 +282,68 @@ def create_dash_app(server: Flask):
         Input('cat-dd','value'),
         Input('sub-dd','value')
     )
+    @callback_cache.memoize(version=xgb_key)
     def update_xgb(cat, sub):
         if not cat or not sub:
             return {}, ""
+        future_df = live_models.forecast_or_refit('category_xgb')
+        if future_df is None:
+            return {}, f"Product forecast: {MODEL_REFRESHING}."
         d = future_df[(future_df['Category']==cat)&(future_df['Sub Category']==sub)]
         fig = go.Figure(go.Bar(x=d['YearMonth_dt'], y=d['Predicted_Sales']))
         fig.update_layout(title=f"Predicted Sales for {cat} > {sub}", xaxis_title="Month", yaxis_title="₹ Sales")
         units = int(d['Predicted_Sales'].sum()/100)  # assume ₹100 per unit
-        msg = f"Stock at least {units} units of {sub} for next 3 months."
+        msg = f"Stock at least {units} units of {sub} for next {XGB_HORIZON} months."
         return fig, msg
 
+    # Background refit: the click only queues a job, the interval polls it
+    @app.callback(
+        Output('refit-job','data'),
+        Output('refit-poll','disabled'),
+        Input('refit-btn','n_clicks'),
+        Input('refit-cancel','n_clicks'),
+        State('cat-dd','value'),
+        State('sub-dd','value'),
+        State('refit-job','data'),
+        prevent_initial_call=True
+    )
+    def control_refit(_, __, cat, sub, job_id):
+        if ctx.triggered_id == 'refit-cancel':
+            if job_id:
+                job_queue.cancel(job_id)
+            return job_id, not job_id
+        if not cat or not sub:
+            return no_update, True
+        grp = series_grp()
+        series = grp[(grp['Category']==cat)&(grp['Sub Category']==sub)]
+        job_id = job_queue.submit('category_predictions:refit_series', cat, sub,
+                                  series['YearMonth'].tolist(), series['Sales'].round(2).tolist())
+        return job_id, False
+
+    @app.callback(
+        Output('refit-status','children'),
+        Output('xgb-graph','figure', allow_duplicate=True),
+        Output('refit-poll','disabled', allow_duplicate=True),
+        Input('refit-poll','n_intervals'),
+        State('refit-job','data'),
+        State('cat-dd','value'),
+        State('sub-dd','value'),
+        prevent_initial_call=True
+    )
+    def poll_refit(_, job_id, cat, sub):
+        job = job_queue.get(job_id) if job_id else None
+        if job is None:
+            return "", no_update, True
+        if job['status'] in ACTIVE:
+            return f"Refit {job['status']}: {job['progress'] or 0:.0%} {job['message']}", no_update, False
+        if job['status'] == DONE:
+            result = job['result']
+            fig = go.Figure(go.Bar(x=result['Month'], y=result['Predicted_Sales']))
+            fig.update_layout(title=f"Refit forecast for {cat} > {sub}", xaxis_title="Month", yaxis_title="₹ Sales")
+            return "Refit finished.", fig, True
+        detail = job['error'].strip().splitlines()[-1] if job['error'] else ""
+        return f"Refit {job['status']}. {detail}", no_update, True
+
     return app
 
 # run on Flask
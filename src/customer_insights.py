@@ -1,81 +1,71 @@
 import dash
 from dash import dcc, html
 import plotly.graph_objs as go
-import pandas as pd
 import dash_bootstrap_components as dbc
+from layout_cache import cache_layout
+from data_store import get_store
 
-def create_dash_app(server):
+def create_dash_app(server, store=None):
 
-    # Load the dataset
-    df = pd.read_csv(r"C:\Users\vaish\Project phase I\Supermart Grocery Sales - Retail Analytics Dataset.csv")
-
-    # Display column names to verify
-    print(df.columns)
-
-    # Replace '-' with '/' in 'Order Date' and convert to datetime
-    df['Order Date'] = df['Order Date'].str.replace('-', '/')
-    df['Order Date'] = pd.to_datetime(df['Order Date'], format='%m/%d/%Y')
-
-    # Calculate Recency: Days since the last purchase for each customer
-    df['recency'] = (df['Order Date'].max() - df['Order Date']).dt.days
-
-    # Calculate Frequency: Number of purchases per customer
-    df['frequency'] = df.groupby('Customer Name')['Order ID'].transform('count')
-
-    # Calculate Monetary: Total spending per customer
-    df['total_spent'] = df.groupby('Customer Name')['Sales'].transform('sum')
-
-    # Calculate Customer Lifetime Value (CLV) for illustration
-    df['clv'] = df['total_spent'] * df['frequency']  # Simple CLV calculation
-
-    # Calculate Repeat Purchase Frequency
-    df['repeat_purchase_frequency'] = df.groupby('Customer Name')['Order ID'].transform('count')
-
-    # Create monetary bins (5 edges, resulting in 5 labels)
-    monetary_bins = [0, 50, 100, 200, 500, float('inf')]  # Example bin edges
-    df['monetary_segment'] = pd.cut(df['total_spent'], bins=monetary_bins, labels=['Very Low Spender', 'Low Spender', 'Medium Spender', 'High Spender', 'Very High Spender'])
+    # Shared dataset and its per-customer RFM state
+    store = store or get_store()
 
     # Create the Dash app
     app = dash.Dash(__name__, server=server, url_base_pathname='/customer/')  # Mount Dash at /customer/
 
-    # Layout for RFM Analysis, Top Customers, CLV, and Repeat Purchase Patterns
-    app.layout = html.Div([
-        # RFM Analysis (Recency, Frequency)
-        dcc.Graph(
-            id='rfm-analysis',
-            figure={
-                'data': [go.Scatter(x=df['recency'], y=df['frequency'], mode='markers')],
-                'layout': go.Layout(title='Recency Frequency Monetary Analysis Analysis')
-            }
-        ),
-
-        # Top Customers (Table)
-        html.Div([
-            dbc.Table.from_dataframe(
-                df[['Customer Name', 'total_spent']].drop_duplicates().nlargest(10, 'total_spent'),
-                striped=True,
-                bordered=True,
-                hover=True
+    def build_layout():
+        # One row per customer: recency, frequency, monetary, quintile scores and segment
+        rfm = store.rfm.table()
+        rfm = rfm.rename(columns={'monetary': 'total_spent'})
+
+        # Ordered by value so the CLV line reads left to right
+        clv = rfm.sort_values('clv', ascending=False)
+
+        # Layout for RFM Analysis, Top Customers, CLV, and Repeat Purchase Patterns
+        return html.Div([
+            # RFM Analysis (Recency, Frequency)
+            dcc.Graph(
+                id='rfm-analysis',
+                figure={
+                    'data': [go.Scatter(
+                        x=rfm['recency'], y=rfm['frequency'], mode='markers',
+                        text=rfm['Customer Name'].astype(str) + ' (' + rfm['segment'].astype(str) + ')',
+                        marker=dict(size=rfm['m_score'] * 4, color=rfm['total_spent'], colorscale='Viridis', showscale=True)
+                    )],
+                    'layout': go.Layout(title='Recency Frequency Monetary Analysis Analysis')
+                }
+            ),
+
+            # Top Customers (Table)
+            html.Div([
+                dbc.Table.from_dataframe(
+                    rfm.nlargest(10, 'total_spent')[['Customer Name', 'total_spent', 'frequency', 'segment']],
+                    striped=True,
+                    bordered=True,
+                    hover=True
+                )
+            ]),
+
+            # Customer Lifetime Value (CLV)
+            dcc.Graph(
+                id='clv',
+                figure={
+                    'data': [go.Scatter(x=clv['Customer Name'], y=clv['clv'], mode='lines')],
+                    'layout': go.Layout(title='Customer Lifetime Value (CLV)')
+                }
+            ),
+
+            # Repeat Purchase Patterns (Bar Chart)
+            dcc.Graph(
+                id='repeat-purchase',
+                figure={
+                    'data': [go.Bar(x=rfm['Customer Name'], y=rfm['frequency'])],
+                    'layout': go.Layout(title='Repeat Purchase Patterns')
+                }
             )
-        ]),
-
-        # Customer Lifetime Value (CLV)
-        dcc.Graph(
-            id='clv',
-            figure={
-                'data': [go.Scatter(x=df['Customer Name'], y=df['clv'], mode='lines')],
-                'layout': go.Layout(title='Customer Lifetime Value (CLV)')
-            }
-        ),
+        ])
 
-        # Repeat Purchase Patterns (Bar Chart)
-        dcc.Graph(
-            id='repeat-purchase',
-            figure={
-                'data': [go.Bar(x=df['Customer Name'], y=df['repeat_purchase_frequency'])],
-                'layout': go.Layout(title='Repeat Purchase Patterns')
-            }
-        )
-    ])
+    # Built, serialized and compressed once per data version
+    cache_layout(app, version=lambda: store.version, build=build_layout)
 
     return app
@@ -0,0 +1,84 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask
+
+
+class LazyDashMounts:
+    """WSGI middleware that builds each Dash sub-app on first hit or in a warm-up pool.
+
+    Every prefix is registered up front, but the data prep and model fitting in
+    its ``create_dash_app`` only run when the prefix is first requested or when
+    ``warm_up`` schedules it in the background. Each sub-app gets its own Flask
+    server so it can be built after the main app has started serving.
+    """
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self._builders = {}
+        self._apps = {}
+        self._errors = {}
+        self._timings = {}
+        self._locks = {}
+        self._executor = None
+
+    def register(self, prefix, build):
+        # build(server) -> Dash app mounted at prefix on the given server
+        self._builders[prefix] = build
+        self._locks[prefix] = threading.Lock()
+
+    def get(self, prefix):
+        if prefix in self._apps:
+            return self._apps[prefix]
+        with self._locks[prefix]:
+            if prefix not in self._apps:
+                start = time.perf_counter()
+                try:
+                    server = Flask(__name__)
+                    self._builders[prefix](server)
+                    self._apps[prefix] = server
+                    self._errors.pop(prefix, None)
+                except Exception as exc:
+                    self._errors[prefix] = repr(exc)
+                    raise
+                finally:
+                    self._timings[prefix] = round(time.perf_counter() - start, 3)
+        return self._apps[prefix]
+
+    def warm_up(self, max_workers=2):
+        # Build every registered sub-app in the background
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dash-warmup")
+        for prefix in self._builders:
+            self._executor.submit(self._warm, prefix)
+        self._executor.shutdown(wait=False)
+
+    def _warm(self, prefix):
+        try:
+            self.get(prefix)
+        except Exception:
+            pass  # kept in self._errors and re-raised on the next request
+
+    def status(self):
+        return {
+            prefix: {
+                "ready": prefix in self._apps,
+                "error": self._errors.get(prefix),
+                "build_seconds": self._timings.get(prefix),
+            }
+            for prefix in self._builders
+        }
+
+    def ready(self):
+        return all(prefix in self._apps for prefix in self._builders)
+
+    def _match(self, path):
+        for prefix in self._builders:
+            if path.startswith(prefix) or path == prefix.rstrip("/"):
+                return prefix
+        return None
+
+    def __call__(self, environ, start_response):
+        prefix = self._match(environ.get("PATH_INFO", ""))
+        if prefix is None:
+            return self.wsgi_app(environ, start_response)
+        return self.get(prefix).wsgi_app(environ, start_response)
@@ -0,0 +1,462 @@
+import copy
+import hashlib
+import os
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from sales_cube import SalesCube
+from rfm import RFMEngine
+from aggregates import SalesAggregates
+from dates import DateParser
+import snapshot
+from snapshot import SNAPSHOT
+
+# Location of the Supermart export; override with SUPERMART_DATA on other machines
+DATA_PATH = os.environ.get(
+    "SUPERMART_DATA",
+    r"C:\Users\vaish\Project phase I\Supermart Grocery Sales - Retail Analytics Dataset.csv"
+)
+
+# Compact mode: categorical dimensions, integer ids/dates and float32 measures
+COMPACT = os.environ.get("SUPERMART_COMPACT", "0") == "1"
+
+# Streaming mode: the file is read in chunks and only aggregates plus a bounded
+# row sample are kept, so histories larger than RAM can be served
+STREAMING = os.environ.get("SUPERMART_STREAMING", "0") == "1"
+CHUNK_ROWS = int(os.environ.get("SUPERMART_CHUNK_ROWS", 500_000))
+SAMPLE_ROWS = int(os.environ.get("SUPERMART_SAMPLE_ROWS", 100_000))
+
+AGGREGATE_COLUMNS = ["Order ID", "Order Date", "Category", "Sub Category", "City", "Region", "Sales", "Discount", "Profit"]
+RFM_COLUMNS = ["Customer Name", "Order ID", "Order Date", "Sales"]
+
+DIMENSIONS = ["Customer Name", "Category", "Sub Category", "City", "Region", "State"]
+MEASURES = ["Sales", "Discount", "Profit"]
+# Raw columns an appended batch must carry for the frame, cube, RFM and aggregates
+REQUIRED_COLUMNS = list(dict.fromkeys(AGGREGATE_COLUMNS + RFM_COLUMNS + DIMENSIONS + MEASURES))
+EPOCH = np.datetime64("1970-01-01", "D")
+
+
+def order_numbers(ids, errors="raise"):
+    # OD1234 -> 1234; only the literal prefix goes
+    return pd.to_numeric(pd.Series(ids).astype(str).str.removeprefix("OD"), errors=errors, downcast="integer")
+
+
+def _bad_rows(col, bad, values, problem):
+    rows = np.flatnonzero(np.asarray(bad))
+    listed = ", ".join(map(str, rows[:10])) + (f" and {len(rows) - 10:,} more" if len(rows) > 10 else "")
+    return ValueError(f"Column '{col}' {problem} in row{'s' if len(rows) > 1 else ''} {listed} "
+                      f"(e.g. {str(values.iloc[rows[0]])!r}).")
+
+
+def read_source(path):
+    # Raw rows of a Supermart export, CSV or parquet
+    if str(path).endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, encoding="utf-8-sig")
+
+
+class SalesDataStore:
+    """Loads, cleans and date-parses the Supermart dataset once for every Dash app."""
+
+    def __init__(self, path=DATA_PATH, compact=COMPACT, streaming=STREAMING,
+                 chunk_rows=CHUNK_ROWS, sample_rows=SAMPLE_ROWS, use_snapshot=SNAPSHOT):
+        self.path = path
+        self.compact = compact
+        self.streaming = streaming
+        self.chunk_rows = chunk_rows
+        self.sample_rows = sample_rows
+        self.use_snapshot = use_snapshot and not streaming
+        self.source_hash = None
+        self._pristine = False
+        self.version = 0
+        self._digest = hashlib.blake2b(digest_size=16)
+        self.dictionaries = {}
+        self.memory_stats = {}
+        self._cube = None
+        self._rfm = None
+        self._aggregates = None
+        self._pending = []
+        self._sample_keys = None
+        self._rng = np.random.default_rng(0)
+        self._lock = threading.RLock()
+        self.dates = DateParser()
+        if path is not None:
+            self.reload()
+
+    @classmethod
+    def from_frame(cls, df, compact=COMPACT):
+        """Store over raw Supermart rows already in memory (the offline pipeline); no file is read."""
+        store = cls(None, compact=compact, streaming=False, use_snapshot=False)
+        frame = store._prepare(df.copy())
+        with store._lock:
+            store._frame = frame
+            store._digest = store._digest_of(frame)
+            store.memory_stats = {"rows": len(frame), "compact": compact, "dates": store.dates.report()}
+            store.version += 1
+        return store
+
+    def reload(self):
+        # Fresh counts of unparseable dates; formats are re-detected per load
+        self.dates = DateParser(self.dates.dayfirst)
+        if self.streaming:
+            return self._reload_streaming()
+        df = self._load(self.path)
+        digest = self._source_digest()
+        with self._lock:
+            self._frame = df
+            self._digest = digest
+            self._pristine = True
+            self._pending = []
+            self._cube = None
+            self._rfm = None
+            self._aggregates = None
+            self.version += 1
+        return self
+
+    def _reload_streaming(self):
+        self.dictionaries = {}
+        cube, rfm, aggregates = SalesCube(), RFMEngine(), SalesAggregates()
+        self._frame, self._sample_keys = None, None
+        rows = raw_bytes = 0
+        for chunk, raw in self._stream(self.path):
+            dated = self._with_dates(chunk)
+            aggregates.update(dated[AGGREGATE_COLUMNS])
+            rfm.update(dated[RFM_COLUMNS])
+            cube.update(dated)
+            self._add_to_sample(chunk)
+            rows += len(chunk)
+            raw_bytes += raw
+        digest = self._source_digest()
+        with self._lock:
+            self._pending = []
+            self._digest = digest
+            self._cube, self._rfm, self._aggregates = cube, rfm, aggregates
+            sample_bytes = int(self._frame.memory_usage(deep=True).sum())
+            self.memory_stats = {
+                "rows": rows,
+                "compact": self.compact,
+                "streaming": True,
+                "chunk_rows": self.chunk_rows,
+                "sample_rows": len(self._frame),
+                "bytes_before": int(raw_bytes),
+                "bytes_after": sample_bytes,
+                "bytes_per_row_before": round(float(raw_bytes) / max(rows, 1), 1),
+                "dates": self.dates.report(),
+            }
+            self.version += 1
+        return self
+
+    def _stream(self, path, progress=True):
+        # Yields (prepared chunk, its in-memory size before cleaning)
+        total = os.path.getsize(path)
+        if str(path).endswith(".parquet"):
+            import pyarrow.parquet as pq
+            parquet = pq.ParquetFile(path)
+            batches = (b.to_pandas() for b in parquet.iter_batches(batch_size=self.chunk_rows))
+            position = None
+            total = parquet.metadata.num_rows
+        else:
+            handle = open(path, "rb")
+            batches = pd.read_csv(handle, encoding="utf-8-sig", chunksize=self.chunk_rows)
+            position = handle.tell
+
+        rows = 0
+        try:
+            for raw in batches:
+                before = int(raw.memory_usage(deep=True).sum())
+                chunk = self._prepare(raw)
+                del raw
+                rows += len(chunk)
+                if progress:
+                    done = position() if position else rows
+                    print(f"\rStreaming {os.path.basename(str(path))}: {rows:,} rows ({done / max(total, 1):.0%})",
+                          end="", file=sys.stderr, flush=True)
+                yield chunk, before
+        finally:
+            if position:
+                handle.close()
+            if progress:
+                print(file=sys.stderr)
+
+    def _source_digest(self):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update((self.source_hash or snapshot.content_hash(self.path)).encode())
+        return digest
+
+    @staticmethod
+    def _digest_of(frame, digest=None):
+        digest = digest or hashlib.blake2b(digest_size=16)
+        digest.update(pd.util.hash_pandas_object(frame, index=False).to_numpy().tobytes())
+        return digest
+
+    @property
+    def data_version(self):
+        # Source file hash folded with every appended batch: unlike `version`,
+        # which counts per process, every process holding the same data agrees on it
+        with self._lock:
+            return self._digest.hexdigest()
+
+    def _add_to_sample(self, batch):
+        # Uniform row sample of bounded size: every row gets a random key and
+        # the smallest keys are kept, so chunks can arrive in any order
+        keys = self._rng.random(len(batch))
+        if self._frame is None:
+            frame, all_keys = batch.reset_index(drop=True), keys
+        else:
+            frames = [self._frame, batch]
+            if self.compact:
+                for col, categories in self.dictionaries.items():
+                    for frame in frames:
+                        frame[col] = frame[col].cat.set_categories(categories)
+            frame = pd.concat(frames, ignore_index=True)
+            all_keys = np.concatenate([self._sample_keys, keys])
+        if len(frame) > self.sample_rows:
+            keep = np.sort(np.argpartition(all_keys, self.sample_rows)[:self.sample_rows])
+            frame, all_keys = frame.take(keep).reset_index(drop=True), all_keys[keep]
+        self._frame, self._sample_keys = frame, all_keys
+
+    def append(self, batch):
+        """Add new orders (raw Supermart columns) without reloading the file.
+
+        Running aggregates, the cube and RFM state are updated from the batch
+        alone; the full frame is only re-concatenated on the next view().
+        In streaming mode the batch only competes for a place in the sample.
+        The batch is checked before anything changes and applied all-or-nothing:
+        a bad batch raises KeyError/ValueError and leaves the store as it was.
+        """
+        batch = self.validate(batch)
+        with self._lock:
+            dictionaries = dict(self.dictionaries)
+            try:
+                batch = self._prepare(batch)
+                if batch.empty:
+                    return 0
+                dated = self._with_dates(batch)
+                # Updated copies first, swapped in only once every one of them succeeded
+                cube = copy.copy(self._cube).update(dated) if self._cube is not None else None
+                rfm = copy.copy(self._rfm).update(dated) if self._rfm is not None else None
+                aggregates = self._aggregates.copy().update(dated) if self._aggregates is not None else None
+                digest = self._digest_of(batch, self._digest.copy())
+            except Exception:
+                self.dictionaries = dictionaries
+                raise
+            if self.streaming:
+                self._add_to_sample(batch)
+            else:
+                self._pending.append(batch)
+            self._pristine = False
+            self._cube, self._rfm, self._aggregates, self._digest = cube, rfm, aggregates, digest
+            self.memory_stats["rows"] = self.memory_stats.get("rows", 0) + len(batch)
+            self.version += 1
+        return len(batch)
+
+    def validate(self, batch):
+        """Raise KeyError/ValueError for a batch append() would reject; return it cleaned.
+
+        Runs the same conversions as _prepare/_compact (with this store's date
+        formats), and a ValueError names the offending rows.
+        """
+        batch = batch.copy()
+        batch.columns = batch.columns.str.strip()
+        missing = [col for col in REQUIRED_COLUMNS if col not in batch.columns]
+        if missing:
+            raise KeyError(f"Orders are missing columns: {', '.join(missing)}")
+        for col in MEASURES:
+            values = pd.to_numeric(batch[col], errors="coerce")
+            bad = values.isna() & batch[col].notna()
+            if bad.any():
+                raise _bad_rows(col, bad, batch[col], "must be numeric")
+            batch[col] = values.astype(np.float64)
+        with self._lock:
+            dates = self.dates.parse(batch["Order Date"], report=False)
+        if dates.isna().any():
+            raise _bad_rows("Order Date", dates.isna(), batch["Order Date"], "has no recognisable date")
+        if self.compact:
+            bad = order_numbers(batch["Order ID"], errors="coerce").isna()
+            if bad.any():
+                raise _bad_rows("Order ID", bad, batch["Order ID"], "is not a number with an optional OD prefix")
+        return batch
+
+    @property
+    def _df(self):
+        # Fold appended batches into the main frame on first use
+        with self._lock:
+            if self._pending:
+                frames = [self._frame] + self._pending
+                if self.compact:
+                    for col, categories in self.dictionaries.items():
+                        for frame in frames:
+                            frame[col] = frame[col].cat.set_categories(categories)
+                self._frame = pd.concat(frames, ignore_index=True)
+                self._pending = []
+            return self._frame
+
+    @property
+    def aggregates(self):
+        # Running KPI totals and daily/monthly/category/city sums
+        with self._lock:
+            if self._aggregates is None:
+                self._aggregates = SalesAggregates(self.view(AGGREGATE_COLUMNS))
+            return self._aggregates
+
+    @property
+    def cube(self):
+        # Built on first use after each load
+        with self._lock:
+            if self._cube is None:
+                self._cube = self._snapshot_cube() or SalesCube(self._df)
+                if self._pristine and self.source_hash:
+                    self._save_snapshot(self._cube.cells, self.memory_stats, "cube")
+            return self._cube
+
+    def _snapshot_tag(self):
+        return ("compact" if self.compact else "full") + ("-dayfirst" if self.dates.dayfirst else "")
+
+    def _snapshot_cube(self):
+        # The cube only matches the snapshot until the first append
+        if not (self._pristine and self.source_hash):
+            return None
+        loaded = snapshot.load(self.path, self.source_hash, self._snapshot_tag(), "cube")
+        return SalesCube.from_cells(loaded[0]) if loaded else None
+
+    def _save_snapshot(self, df, meta, name="frame"):
+        try:
+            snapshot.save(self.path, self.source_hash, self._snapshot_tag(), df, meta, name)
+        except (OSError, ValueError, TypeError) as exc:
+            # A read-only data directory or odd column types just mean no snapshot
+            print(f"Snapshot not written: {exc}", file=sys.stderr)
+
+    @property
+    def rfm(self):
+        # Per-customer recency/frequency/monetary state, built on first use
+        with self._lock:
+            if self._rfm is None:
+                self._rfm = RFMEngine(self.view(RFM_COLUMNS))
+            return self._rfm
+
+    def _load(self, path):
+        # A memory-mapped snapshot of the cleaned frame, if this exact file was loaded before
+        self.source_hash = snapshot.content_hash(path) if self.use_snapshot else None
+        if self.source_hash:
+            loaded = snapshot.load(path, self.source_hash, self._snapshot_tag())
+            if loaded is not None:
+                df, self.memory_stats = loaded
+                self.memory_stats["snapshot"] = True
+                if self.compact:
+                    self.dictionaries = {col: df[col].cat.categories for col in DIMENSIONS + ["Weekday", "YearMonth"]}
+                return df
+
+        df = read_source(path)
+        before = df.memory_usage(deep=True).sum()
+        df = self._prepare(df)
+        after = df.memory_usage(deep=True).sum()
+        rows = max(len(df), 1)
+        self.memory_stats = {
+            "rows": len(df),
+            "compact": self.compact,
+            "bytes_before": int(before),
+            "bytes_after": int(after),
+            "bytes_per_row_before": round(float(before) / rows, 1),
+            "bytes_per_row_after": round(float(after) / rows, 1),
+            "dates": self.dates.report(),
+        }
+        if self.source_hash:
+            self._save_snapshot(df, self.memory_stats)
+        return df
+
+    def _prepare(self, df):
+        # Clean column names
+        df.columns = df.columns.str.strip()
+
+        if "Order Date" not in df.columns:
+            raise KeyError("The dataset does not contain an 'Order Date' column. Check column names: " + str(df.columns))
+
+        # Dates come as both 11-08-2023 and 4/15/2024, always month first;
+        # rows that match no detected format are reported, then dropped
+        df["Order Date"] = self.dates.parse(df["Order Date"])
+        df = df.dropna(subset=["Order Date"]).reset_index(drop=True)
+
+        # Derived calendar columns shared by the dashboards
+        df["Year"] = df["Order Date"].dt.year
+        df["Month"] = df["Order Date"].dt.month
+        df["Weekday"] = df["Order Date"].dt.day_name()
+        df["YearMonth"] = df["Order Date"].dt.to_period("M").astype(str)
+
+        if self.compact:
+            df = self._compact(df)
+        return df
+
+    def _compact(self, df):
+        # Dimensions become category codes; the dictionaries are kept and only
+        # ever grow at the end, so codes already handed out stay valid
+        for col in DIMENSIONS + ["Weekday", "YearMonth"]:
+            if col in self.dictionaries:
+                known = self.dictionaries[col]
+                categories = known.append(pd.Index(sorted(set(df[col].unique()) - set(known))))
+            else:
+                categories = pd.Index(sorted(df[col].unique()))
+            self.dictionaries[col] = categories
+            df[col] = pd.Categorical(df[col], categories=categories)
+
+        df["Order ID"] = order_numbers(df["Order ID"]).to_numpy()
+
+        # Dates as int32 day numbers; view() turns them back into 'Order Date'
+        df["Order Day"] = (df["Order Date"].values.astype("datetime64[D]") - EPOCH).astype(np.int32)
+        df = df.drop(columns="Order Date")
+        df["Year"] = df["Year"].astype(np.int16)
+        df["Month"] = df["Month"].astype(np.int8)
+
+        # float32 only where it keeps the values to the cent
+        for col in MEASURES:
+            values = df[col].to_numpy(dtype=np.float64)
+            narrow = values.astype(np.float32)
+            if np.allclose(narrow, values, rtol=0, atol=0.005, equal_nan=True):
+                df[col] = narrow
+        return df
+
+    def memory_report(self):
+        return dict(self.memory_stats)
+
+    @property
+    def df(self):
+        return self.view()
+
+    def view(self, columns=None):
+        # Shallow copy: callers may add or drop columns without touching the shared frame.
+        # In streaming mode this is the row sample; totals must come from aggregates/cube/rfm
+        df = self._df
+        wants_dates = columns is None or "Order Date" in columns
+        if columns is not None:
+            columns = list(columns)
+            if self.compact and "Order Date" in columns:
+                columns[columns.index("Order Date")] = "Order Day"
+            df = df[columns]
+        df = df.copy(deep=False)
+        if wants_dates:
+            df = self._with_dates(df)
+        return df
+
+    def _with_dates(self, df):
+        if self.compact and "Order Day" in df.columns:
+            df = df.copy(deep=False)
+            df.insert(df.columns.get_loc("Order Day"), "Order Date", self.order_dates(df["Order Day"]))
+            df = df.drop(columns="Order Day")
+        return df
+
+    @staticmethod
+    def order_dates(days):
+        return pd.Series((EPOCH + days.to_numpy()).astype("datetime64[ns]"), index=days.index, name="Order Date")
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store(path=DATA_PATH):
+    # Process-wide store so every sub-app shares one parsed frame
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SalesDataStore(path)
+        return _store
@@ -0,0 +1,105 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Supermart exports are month first (11-08-2023 is 8 November); flip for day-first sources
+DAYFIRST = os.environ.get("SUPERMART_DAYFIRST", "0") == "1"
+
+# Candidate layouts, tried against a sample of each separator's distinct values
+DATE_FORMATS = ["%m/%d/%Y", "%m-%d-%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d", "%Y/%m/%d", "%m/%d/%y", "%d/%m/%y",
+                "%Y-%m-%d %H:%M:%S", "%m/%d/%Y %H:%M", "%d.%m.%Y"]
+SAMPLE_SIZE = 2000
+CACHE_LIMIT = 1_000_000
+
+
+def _shape(values):
+    # '11-08-2023' -> '99-99-9999', '4/5/2024' -> '9/9/9999'
+    return pd.Series(values, dtype=object).str.replace(r"\d", "9", regex=True)
+
+
+class DateParser:
+    """Parses 'Order Date' strings the same way for every batch.
+
+    The layout is detected once per date shape from a sample, each distinct
+    string is parsed only once (and remembered across batches), and strings
+    that match no detected layout are counted rather than silently dropped.
+    """
+
+    def __init__(self, dayfirst=DAYFIRST, formats=DATE_FORMATS):
+        self.dayfirst = dayfirst
+        self.candidates = sorted(formats, key=lambda f: f.startswith("%d") != dayfirst)
+        self.formats = {}
+        self.unparseable = 0
+        self.examples = []
+        self._cache = pd.Series(dtype="datetime64[ns]")
+
+    def detect(self, uniques):
+        # One format per shape: the candidate parsing most of the sample (earlier wins ties), so a
+        # few bad strings only lose themselves; a shape no candidate parses at all gets none
+        shapes = _shape(uniques)
+        for shape in shapes.unique():
+            if shape in self.formats:
+                continue
+            sample = uniques[(shapes == shape).to_numpy()][:SAMPLE_SIZE]
+            best, best_count = None, 0
+            for fmt in self.candidates:
+                count = int(pd.to_datetime(sample, format=fmt, errors="coerce").notna().sum())
+                if count > best_count:
+                    best, best_count = fmt, count
+                if best_count == len(sample):
+                    break
+            self.formats[shape] = best
+        return self.formats
+
+    def _parse_new(self, uniques):
+        self.detect(uniques)
+        shapes = _shape(uniques).to_numpy()
+        parsed = pd.Series(pd.NaT, index=uniques, dtype="datetime64[ns]")
+        for shape, fmt in self.formats.items():
+            mask = shapes == shape
+            if fmt is not None and mask.any():
+                parsed.iloc[mask] = pd.to_datetime(uniques[mask], format=fmt, errors="coerce").to_numpy()
+        return parsed
+
+    def parse(self, values, report=True):
+        if pd.api.types.is_datetime64_any_dtype(values):
+            return pd.Series(values).astype("datetime64[ns]")
+        values = pd.Series(values)
+        # Everything below runs on the distinct strings only
+        codes, uniques = pd.factorize(values)
+        uniques = np.asarray(pd.Index(uniques).astype(str).str.strip(), dtype=object)
+
+        known = self._cache.reindex(uniques)
+        missing = ~pd.Index(uniques).isin(self._cache.index)
+        if missing.any():
+            fresh = self._parse_new(uniques[missing])
+            known.iloc[missing] = fresh.to_numpy()
+            fresh = fresh[~fresh.index.duplicated()]
+            if len(self._cache) + len(fresh) > CACHE_LIMIT:
+                self._cache = self._cache.iloc[:0]
+            self._cache = pd.concat([self._cache, fresh])
+
+        dates = known.to_numpy()
+        result = pd.Series(np.where(codes >= 0, dates[codes], np.datetime64("NaT")), index=values.index,
+                           name=values.name, dtype="datetime64[ns]")
+        if report:
+            self._report(values, result)
+        return result
+
+    def _report(self, values, result):
+        bad = result.isna() & values.notna()
+        count = int(bad.sum())
+        if not count:
+            return
+        self.unparseable += count
+        examples = values[bad].astype(str).unique()[:5].tolist()
+        self.examples = (self.examples + [e for e in examples if e not in self.examples])[:5]
+        print(f"Order Date: {count:,} rows not parseable, e.g. {examples}", file=sys.stderr)
+
+    def report(self):
+        return {
+            "formats": {shape: fmt for shape, fmt in self.formats.items()},
+            "unparseable_rows": self.unparseable,
+            "examples": list(self.examples),
+        }
@@ -0,0 +1,183 @@
+import os
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+# Threads per fit. One by default: fits run beside web workers and job workers
+# that already use every core; raise it on a box dedicated to fitting
+XGB_THREADS = int(os.environ.get("XGB_THREADS", 1))
+
+# Histogram trees on lag/rolling/calendar/discount features, early-stopped on the
+# last `holdout` months; when only new months arrive the previous model grows
+# `warm_rounds` more trees instead of refitting, with a full refit every `refit_every`
+XGB_PARAMS = dict(n_estimators=600, learning_rate=0.05, max_depth=4, tree_method="hist",
+                  early_stopping_rounds=30, holdout=3, warm_rounds=40, refit_every=6)
+
+LAGS = (1, 2, 3, 6, 12)
+WINDOWS = (3, 6, 12)
+FEATURES = (
+    ["Category_enc", "Sub_enc", "Month_Ordinal", "Month_of_Year", "Quarter"]
+    + [f"Lag_{k}" for k in LAGS]
+    + [f"Rolling_{w}" for w in WINDOWS]
+    + ["Discount_Lag_1", "Discount_Rolling_3"]
+)
+# Everything else in the params dict goes to XGBRegressor
+TRAINING_KEYS = ("holdout", "warm_rounds", "refit_every")
+
+# date.toordinal() of 1970-01-01
+EPOCH_ORDINAL = 719163
+
+
+def month_ordinal(dates):
+    # Vectorized Timestamp.toordinal()
+    days = pd.to_datetime(dates).to_numpy().astype("datetime64[D]").astype("int64")
+    return days + EPOCH_ORDINAL
+
+
+def series_matrix(grp):
+    """Sales and mean discount as (series x month) arrays over one shared month range.
+
+    Months without orders are 0 sales and an unknown (NaN) discount.
+    """
+    keys = ["Category", "Sub Category"]
+    months = pd.date_range(grp["YearMonth_dt"].min(), grp["YearMonth_dt"].max(), freq="MS")
+    indexed = grp.set_index(keys + ["YearMonth_dt"])
+    sales = indexed["Sales"].astype(np.float64).unstack("YearMonth_dt").reindex(columns=months)
+    discount = indexed["Discount"].astype(np.float64).unstack("YearMonth_dt").reindex(index=sales.index, columns=months)
+    values = sales.to_numpy()
+    # Rows only start once a series has sold something
+    first = np.argmax(~np.isnan(values), axis=1)
+    return {
+        "series": sales.index,
+        "months": months,
+        "sales": np.nan_to_num(values),
+        "discount": discount.to_numpy(),
+        "first": first,
+    }
+
+
+def head(matrix, n):
+    # The matrix as it looked with only its first n months
+    return dict(matrix, months=matrix["months"][:n], sales=matrix["sales"][:, :n], discount=matrix["discount"][:, :n])
+
+
+def _shifted(values, columns, k):
+    # values[:, c - k] for each c in columns; NaN before the first month
+    index = columns - k
+    out = values[:, np.maximum(index, 0)]
+    out[:, index < 0] = np.nan
+    return out
+
+
+def _trailing_mean(values, columns, window):
+    # Mean of the `window` months before each column, ignoring NaNs; NaN if none
+    filled = np.concatenate([np.zeros((len(values), 1)), np.nancumsum(values, axis=1)], axis=1)
+    counts = np.concatenate([np.zeros((len(values), 1)), np.cumsum(~np.isnan(values), axis=1)], axis=1)
+    start = np.maximum(columns - window, 0)
+    total = filled[:, columns] - filled[:, start]
+    n = counts[:, columns] - counts[:, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, total / np.maximum(n, 1), np.nan)
+
+
+def build_features(matrix, columns, codes):
+    """Feature rows for every series at each month index in `columns`, from the months before it.
+
+    Rows are month-major: all series for columns[0], then all for columns[1], ...
+    Every feature is one array operation over the whole (series x month) matrix.
+    """
+    columns = np.asarray(columns, dtype=np.int64)
+    sales, discount = matrix["sales"], matrix["discount"]
+    n = len(sales)
+    dates = pd.date_range(matrix["months"][0], periods=columns.max() + 1, freq="MS")[columns]
+
+    def flat(block):
+        return block.ravel(order="F")
+
+    features = {
+        "Category_enc": np.tile(codes["category"], len(columns)),
+        "Sub_enc": np.tile(codes["sub_category"], len(columns)),
+        "Month_Ordinal": np.repeat(month_ordinal(dates), n),
+        "Month_of_Year": np.repeat(dates.month.to_numpy(), n),
+        "Quarter": np.repeat(dates.quarter.to_numpy(), n),
+    }
+    for k in LAGS:
+        features[f"Lag_{k}"] = flat(_shifted(sales, columns, k))
+    for w in WINDOWS:
+        features[f"Rolling_{w}"] = flat(_trailing_mean(sales, columns, w))
+    features["Discount_Lag_1"] = flat(_shifted(discount, columns, 1))
+    features["Discount_Rolling_3"] = flat(_trailing_mean(discount, columns, 3))
+    return pd.DataFrame(features, columns=FEATURES)
+
+
+def training_rows(matrix, columns, codes):
+    # Features and targets for these months, skipping months before a series' first sale
+    columns = np.asarray(columns, dtype=np.int64)
+    X = build_features(matrix, columns, codes)
+    y = matrix["sales"][:, columns].ravel(order="F")
+    keep = (columns[None, :] >= matrix["first"][:, None]).ravel(order="F")
+    return X[keep], y[keep]
+
+
+def _regressor(params, **overrides):
+    return XGBRegressor(**dict(params, nthread=XGB_THREADS, **overrides))
+
+
+def train(matrix, codes, params):
+    """Full fit: hist trees, early-stopped on the last `holdout` months, trimmed to the best round."""
+    params = dict(params)
+    holdout = params.pop("holdout", 3)
+    for key in TRAINING_KEYS:
+        params.pop(key, None)
+    months = len(matrix["months"])
+    cut = max(months - holdout, 2)
+    X_train, y_train = training_rows(matrix, np.arange(1, cut), codes)
+    if cut < months:
+        X_hold, y_hold = training_rows(matrix, np.arange(cut, months), codes)
+        model = _regressor(params).fit(X_train, y_train, eval_set=[(X_hold, y_hold)], verbose=False)
+        booster = model.get_booster()[: model.best_iteration + 1]
+    else:
+        params.pop("early_stopping_rounds", None)
+        booster = _regressor(params).fit(X_train, y_train).get_booster()
+    return booster, cut
+
+
+def continue_training(booster, matrix, codes, params, since):
+    """Warm start: grow `warm_rounds` more trees on the months from `since` on only."""
+    params = dict(params)
+    rounds = params.pop("warm_rounds", 50)
+    for key in TRAINING_KEYS + ("early_stopping_rounds", "n_estimators"):
+        params.pop(key, None)
+    X, y = training_rows(matrix, np.arange(since, len(matrix["months"])), codes)
+    return _regressor(params, n_estimators=rounds).fit(X, y, xgb_model=booster).get_booster()
+
+
+def forecast(booster, matrix, codes, horizon):
+    """Recursive multi-step forecast: each predicted month feeds the next month's lags."""
+    sales = np.concatenate([matrix["sales"], np.full((len(matrix["sales"]), horizon), np.nan)], axis=1)
+    discount = np.concatenate([matrix["discount"], np.full_like(sales[:, -horizon:], np.nan)], axis=1)
+    extended = dict(matrix, sales=sales, discount=discount)
+    start = len(matrix["months"])
+    for c in range(start, start + horizon):
+        # Discounts ahead are assumed to stay at their recent level
+        discount[:, c] = _trailing_mean(discount, np.array([c]), 3)[:, 0]
+        X = build_features(extended, [c], codes)
+        sales[:, c] = booster.inplace_predict(X)
+    return sales[:, start:]
+
+
+def can_continue(state, matrix, params):
+    """True when `state` was trained with these params on exactly the older months of `matrix`."""
+    if state is None or not isinstance(state, dict) or state.get("params") != params:
+        return False
+    if state["warm_starts"] + 1 >= params.get("refit_every", 6):
+        return False
+    old = state["matrix"]
+    known = len(old["months"])
+    return (
+        old["series"].equals(matrix["series"])
+        and len(matrix["months"]) > known
+        and old["months"].equals(matrix["months"][:known])
+        and np.allclose(old["sales"], matrix["sales"][:, :known])
+        and np.allclose(old["discount"], matrix["discount"][:, :known], equal_nan=True)
+    )
@@ -0,0 +1,158 @@
+import argparse
+import io
+import os
+import sys
+from data_store import DATA_PATH, SalesDataStore
+from model_registry import LiveModels, live_models
+from pipeline import MODELS, WARM_START, tidy_forecast
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # CSV only
+    pa = None
+
+# Rows per chunk; only one chunk of an export is ever rendered at a time
+EXPORT_CHUNK_ROWS = int(os.environ.get("EXPORT_CHUNK_ROWS", 100_000))
+
+FORECAST_COLUMNS = ["Model", "Category", "Sub Category", "City", "Month", "Forecast"]
+AGGREGATES = ["daily_sales", "monthly_sales", "category_sales", "city_sales", "region_sales", "sub_category_sales",
+              "discount_sales", "category_sub_sales", "category_sub_monthly", "series_monthly"]
+TABLES = ["forecasts"] + AGGREGATES
+FORMATS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def register_models(models=live_models, store=None):
+    # Every model the pipeline knows, so exports work before any dashboard is built
+    for name, (prepare, fit, params) in MODELS.items():
+        if name not in models.specs:
+            models.register(name, prepare, fit, params, store, name in WARM_START)
+    return models
+
+
+def forecast_chunks(models=live_models, chunk_rows=EXPORT_CHUNK_ROWS, fit=False):
+    """Every model's forecast in the pipeline's long layout, chunk_rows at a time.
+
+    Artifacts are resolved before the first chunk, so a model missing from the
+    registry raises ModelUnavailable up front instead of truncating the file.
+    Only fit=True (the CLI) fits missing models.
+    """
+    forecasts = {name: models.get(name, fit=fit)["forecast"] for name in MODELS}
+    return _melted(forecasts, chunk_rows)
+
+
+def _melted(forecasts, chunk_rows):
+    for name, forecast in forecasts.items():
+        # Wide per-series forecasts are melted a block of series at a time
+        step = max(chunk_rows // forecast.shape[1], 1) if forecast.columns.name == "Month" else chunk_rows
+        for start in range(0, len(forecast), step):
+            chunk = tidy_forecast(name, forecast.iloc[start:start + step])
+            yield chunk.reindex(columns=FORECAST_COLUMNS)
+
+
+def aggregate_chunks(aggregates, name, chunk_rows=EXPORT_CHUNK_ROWS):
+    series = getattr(aggregates, name).sort_index()
+    for start in range(0, len(series), chunk_rows):
+        yield series.iloc[start:start + chunk_rows].rename("Sales").reset_index()
+
+
+def table_chunks(name, store=None, models=live_models, chunk_rows=EXPORT_CHUNK_ROWS, fit=False):
+    if name == "forecasts":
+        return forecast_chunks(models, chunk_rows, fit)
+    if name in AGGREGATES:
+        return aggregate_chunks(store.aggregates, name, chunk_rows)
+    raise KeyError(f"Unknown export {name!r}; choose from {', '.join(TABLES)}.")
+
+
+def csv_stream(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+
+class _Pending(io.RawIOBase):
+    # Write target for ParquetWriter that hands back whatever was written since the last drain
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self.parts.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+
+def _arrow_schema(name):
+    if name != "forecasts":
+        return None
+    string = pa.string()
+    return pa.schema([("Model", string), ("Category", string), ("Sub Category", string), ("City", string),
+                      ("Month", pa.timestamp("ns")), ("Forecast", pa.float64())])
+
+
+def parquet_stream(chunks, schema=None):
+    """One row group per chunk; bytes are yielded as each row group is written."""
+    if pa is None:
+        raise ValueError("Parquet export needs pyarrow.")
+    sink, writer = _Pending(), None
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(sink, schema)
+            writer.write_table(table)
+            yield sink.drain()
+        if writer is None:
+            writer = pq.ParquetWriter(sink, schema or pa.schema([]))
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+def stream(name, fmt="csv", store=None, models=live_models, chunk_rows=EXPORT_CHUNK_ROWS, fit=False):
+    """Generator of the encoded export; nothing is computed until the first chunk is asked for."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}; use csv or parquet.")
+    if fmt == "parquet" and pa is None:
+        raise ValueError("Parquet export needs pyarrow.")
+    chunks = table_chunks(name, store, models, chunk_rows, fit)
+    if fmt == "csv":
+        return csv_stream(chunks)
+    return parquet_stream(chunks, _arrow_schema(name))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export forecasts or aggregates as CSV or Parquet")
+    parser.add_argument("table", choices=TABLES)
+    parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--chunk-rows", type=int, default=EXPORT_CHUNK_ROWS)
+    parser.add_argument("--out", default="-", help="output file, - for stdout")
+    args = parser.parse_args()
+
+    store = SalesDataStore(args.data)
+    models = register_models(LiveModels(store_getter=lambda: store), store)
+    out = sys.stdout.buffer if args.out == "-" else open(args.out, "wb")
+    written = 0
+    try:
+        for block in stream(args.table, args.format, store, models, args.chunk_rows, fit=True):
+            out.write(block)
+            written += len(block)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"Wrote {written} bytes of {args.table} as {args.format}", file=sys.stderr)
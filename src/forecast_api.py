@@ -0,0 +1,192 @@
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from forecast_engine import forecast_wide
+from model_registry import ModelUnavailable, live_models
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # JSON only
+    pa = None
+
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+# Months precomputed per series; a request can ask for any horizon up to this
+API_HORIZON = int(os.environ.get("FORECAST_API_HORIZON", 12))
+API_MAX_SERIES = int(os.environ.get("FORECAST_API_MAX_SERIES", 20000))
+
+SERIES_MODEL = "series_hw"
+SERIES_PARAMS = dict(horizon=API_HORIZON)
+SERIES_KEYS = ["Category", "Sub Category", "City"]
+# A missing city asks for the (Category, Sub Category) total over every city
+ALL_CITIES = "*"
+
+
+def series_sales(aggregates):
+    # One row per (Category, Sub Category, City), one column per month, missing months are 0
+    wide = aggregates.series_monthly.astype(np.float64).unstack("Month", fill_value=0.0)
+    wide.columns = wide.columns.to_period("M")
+    full = pd.period_range(wide.columns.min(), wide.columns.max(), freq="M")
+    return wide.reindex(columns=full, fill_value=0.0)
+
+
+def fit_series_forecasts(wide, horizon=API_HORIZON):
+    # Per-series Holt-Winters; only the forecasts are worth keeping
+    return None, forecast_wide(wide, horizon)
+
+
+def register(models=live_models):
+    if SERIES_MODEL not in models.specs:
+        models.register(SERIES_MODEL, series_sales, fit_series_forecasts, SERIES_PARAMS)
+    return models
+
+
+class ForecastIndex:
+    """Forecast matrix with a hashed (Category, Sub Category, City) index for batched lookups."""
+
+    def __init__(self, forecast):
+        # Demand cannot go negative, whatever the trend extrapolates to
+        forecast = forecast.clip(lower=0)
+        totals = forecast.groupby(level=["Category", "Sub Category"]).sum()
+        totals.index = pd.MultiIndex.from_arrays(
+            [totals.index.get_level_values(0), totals.index.get_level_values(1),
+             np.full(len(totals), ALL_CITIES, dtype=object)], names=SERIES_KEYS,
+        )
+        table = pd.concat([forecast, totals])
+        self.index = table.index
+        self.values = table.to_numpy(np.float64).round(2)
+        self.months = [month.strftime("%Y-%m") for month in table.columns]
+        self.horizon = len(self.months)
+
+    def lookup(self, categories, sub_categories, cities):
+        # Row per requested key, -1 where the series is unknown
+        wanted = pd.MultiIndex.from_arrays([categories, sub_categories, cities])
+        return self.index.get_indexer(wanted)
+
+
+_index = (None, None)
+_index_lock = threading.Lock()
+
+
+def current_index():
+    # Rebuilt only when the registry swaps in a new series forecast. Never fits in the
+    # web process: ModelUnavailable until the refit job has stored one
+    global _index
+    try:
+        artifact = live_models.get(SERIES_MODEL, fit=False)
+    except ModelUnavailable:
+        live_models.request_refit()
+        raise
+    key, index = _index
+    if key != artifact["key"]:
+        with _index_lock:
+            if _index[0] != artifact["key"]:
+                _index = (artifact["key"], ForecastIndex(artifact["forecast"]))
+            key, index = _index
+    return key, index
+
+
+def _column(values, n, name):
+    if values is None or isinstance(values, (str, int, float)):
+        return [values] * n
+    if len(values) != n:
+        raise ValueError(f"'{name}' has {len(values)} values, expected {n}.")
+    return list(values)
+
+
+def parse_keys(payload):
+    """Columns category, sub_category, city, horizon from a request.
+
+    Accepts columns ({"category": [...], "sub_category": [...], ...}) or rows
+    ({"series": [{"category": ..., "sub_category": ...}, ...]}); city and
+    horizon may be single values applying to every key. A single category is
+    one key.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("Expected a JSON object.")
+    if "series" in payload:
+        rows = payload["series"]
+        payload = {name: [row.get(name) for row in rows] for name in ("category", "sub_category", "city", "horizon")}
+        payload["horizon"] = [h if h is not None else API_HORIZON for h in payload["horizon"]]
+    if "category" not in payload or "sub_category" not in payload:
+        raise KeyError("Both 'category' and 'sub_category' are required.")
+
+    categories = payload["category"]
+    if categories is None or isinstance(categories, (str, int, float)):
+        categories = [categories]
+    categories = list(categories)
+    n = len(categories)
+    if n > API_MAX_SERIES:
+        raise ValueError(f"At most {API_MAX_SERIES} series per request.")
+    sub_categories = _column(payload["sub_category"], n, "sub_category")
+    cities = [c if c else ALL_CITIES for c in _column(payload.get("city"), n, "city")]
+    horizons = _horizons(_column(payload.get("horizon", API_HORIZON), n, "horizon"))
+    return {"category": categories, "sub_category": sub_categories, "city": cities, "horizon": horizons}
+
+
+def _horizons(values):
+    # Whole months from 1 to API_HORIZON; query strings send them as text
+    months = pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    if len(months) and (np.isnan(months).any() or (months != np.floor(months)).any()
+                        or months.min() < 1 or months.max() > API_HORIZON
+                        or any(isinstance(v, bool) for v in values)):
+        raise ValueError(f"horizon must be a whole number of months from 1 to {API_HORIZON}.")
+    return months.astype(np.int64)
+
+
+def read_arrow(body):
+    if pa is None:
+        raise ValueError("Arrow requests need pyarrow on the server.")
+    table = ipc.open_stream(body).read_all()
+    payload = {name: table.column(name).to_pylist() for name in table.column_names}
+    if "horizon" in payload:
+        payload["horizon"] = [h if h is not None else API_HORIZON for h in payload["horizon"]]
+    return parse_keys(payload)
+
+
+def answer(keys, arrow=False):
+    """(body, mimetype) with the forecasts for every requested key, in request order."""
+    model_key, index = current_index()
+    rows = index.lookup(keys["category"], keys["sub_category"], keys["city"])
+    found = rows >= 0
+    horizons = keys["horizon"]
+    if arrow:
+        return _arrow_body(index, keys, rows, found, horizons, model_key), ARROW_MIME
+
+    values = index.values[np.where(found, rows, 0)]
+    forecasts = [v[:h] if ok else None for v, h, ok in zip(values.tolist(), horizons.tolist(), found.tolist())]
+    body = {
+        "model": model_key[:12],
+        "version": live_models.version,
+        "months": index.months,
+        "forecasts": forecasts,
+        "missing": np.flatnonzero(~found).tolist(),
+    }
+    return json.dumps(body, separators=(",", ":")), "application/json"
+
+
+def _arrow_body(index, keys, rows, found, horizons, model_key):
+    if pa is None:
+        raise ValueError("Arrow responses need pyarrow on the server.")
+    # One row per requested key, in request order; forecast is a list of `horizon` values, null when unknown
+    lengths = np.where(found, horizons, 0)
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+    position = np.repeat(np.arange(len(rows)), lengths)
+    step = np.arange(len(position)) - offsets[position]
+    forecast = pa.ListArray.from_arrays(pa.array(offsets), pa.array(index.values[rows[position], step]),
+                                        mask=pa.array(~found))
+    table = pa.table({
+        "category": pa.array(keys["category"]).dictionary_encode(),
+        "sub_category": pa.array(keys["sub_category"]).dictionary_encode(),
+        "city": pa.array(keys["city"]).dictionary_encode(),
+        "forecast": forecast,
+    })
+    table = table.replace_schema_metadata({"model": model_key[:12], "version": str(live_models.version),
+                                           "months": json.dumps(index.months)})
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
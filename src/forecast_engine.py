@@ -0,0 +1,102 @@
+import argparse
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.holtwinters import ExponentialSmoothing
+
+# One series per combination of these columns
+SERIES_KEYS = ["Category", "Sub Category", "City", "Region"]
+
+FORECAST_WORKERS = int(os.environ.get("FORECAST_WORKERS", os.cpu_count() or 1))
+FORECAST_CHUNKSIZE = int(os.environ.get("FORECAST_CHUNKSIZE", 64))
+SEASONAL_PERIODS = 12
+
+
+def monthly_series(df, keys=SERIES_KEYS):
+    # Wide frame: one row per series, one column per month, missing months are 0
+    month = df["Order Date"].dt.to_period("M")
+    wide = (
+        df.groupby([df[k] for k in keys] + [month.rename("Month")], observed=True)["Sales"]
+        .sum()
+        .astype(np.float64)
+        .unstack("Month", fill_value=0.0)
+    )
+    full = pd.period_range(wide.columns.min(), wide.columns.max(), freq="M")
+    return wide.reindex(columns=full, fill_value=0.0)
+
+
+def fit_forecast(values, horizon, seasonal_periods=SEASONAL_PERIODS):
+    values = np.asarray(values, dtype=np.float64)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        try:
+            if len(values) >= 2 * seasonal_periods:
+                model = ExponentialSmoothing(values, trend="add", seasonal="add",
+                                             seasonal_periods=seasonal_periods,
+                                             initialization_method="estimated")
+            elif len(values) >= 4:
+                model = ExponentialSmoothing(values, trend="add", initialization_method="estimated")
+            else:
+                return np.repeat(values.mean() if len(values) else 0.0, horizon)
+            return np.asarray(model.fit().forecast(horizon))
+        except (ValueError, np.linalg.LinAlgError):
+            # Degenerate series (all zeros, constant...): carry the recent level forward
+            return np.repeat(values[-3:].mean(), horizon)
+
+
+def _fit_chunk(chunk, horizon, seasonal_periods):
+    return [fit_forecast(values, horizon, seasonal_periods) for values in chunk]
+
+
+def forecast_wide(wide, horizon=3, workers=FORECAST_WORKERS, chunksize=FORECAST_CHUNKSIZE,
+                  seasonal_periods=SEASONAL_PERIODS):
+    """Fit one Holt-Winters model per row of a monthly_series() frame.
+
+    Rows are split into chunks of ``chunksize`` and fitted across ``workers``
+    processes; ``workers=1`` fits in-process. Returns the same index with one
+    column per forecast month.
+    """
+    values = wide.to_numpy()
+    chunks = [values[i:i + chunksize] for i in range(0, len(values), chunksize)]
+
+    if workers > 1 and len(chunks) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(_fit_chunk, chunks, [horizon] * len(chunks), [seasonal_periods] * len(chunks))
+            forecasts = [f for chunk in results for f in chunk]
+    else:
+        forecasts = [f for chunk in chunks for f in _fit_chunk(chunk, horizon, seasonal_periods)]
+
+    months = pd.period_range(wide.columns[-1] + 1, periods=horizon, freq="M").to_timestamp()
+    out = pd.DataFrame(
+        np.vstack(forecasts) if forecasts else np.empty((0, horizon)),
+        index=wide.index, columns=months,
+    )
+    out.columns.name = "Month"
+    return out
+
+
+def forecast_all(df, keys=SERIES_KEYS, horizon=3, workers=FORECAST_WORKERS,
+                 chunksize=FORECAST_CHUNKSIZE, seasonal_periods=SEASONAL_PERIODS):
+    # Tidy frame: one row per series and forecast month
+    out = forecast_wide(monthly_series(df, keys), horizon, workers, chunksize, seasonal_periods)
+    return out.stack().rename("Forecasted Sales").reset_index()
+
+
+if __name__ == "__main__":
+    from data_store import DATA_PATH, SalesDataStore
+
+    parser = argparse.ArgumentParser(description="Forecast every Category/Sub Category/City/Region series")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--keys", nargs="+", default=SERIES_KEYS)
+    parser.add_argument("--horizon", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=FORECAST_WORKERS)
+    parser.add_argument("--chunksize", type=int, default=FORECAST_CHUNKSIZE)
+    parser.add_argument("--out", default="forecasts.csv")
+    args = parser.parse_args()
+
+    df = SalesDataStore(args.data).view()
+    result = forecast_all(df, args.keys, args.horizon, args.workers, args.chunksize)
+    result.to_csv(args.out, index=False)
+    print(f"Wrote {len(result)} forecasts for {len(result) // max(args.horizon, 1)} series to {args.out}")
@@ -0,0 +1,165 @@
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Supermart schema, in file order
+COLUMNS = ["Order ID", "Customer Name", "Category", "Sub Category", "City", "Order Date",
+           "Region", "Sales", "Discount", "Profit", "State"]
+
+CATEGORIES = {
+    "Bakery": ["Biscuits", "Cakes", "Breads & Buns"],
+    "Beverages": ["Health Drinks", "Soft Drinks"],
+    "Eggs, Meat & Fish": ["Eggs", "Chicken", "Mutton", "Fish"],
+    "Food Grains": ["Atta & Flour", "Organic Staples", "Dals & Pulses", "Rice"],
+    "Fruits & Veggies": ["Fresh Vegetables", "Fresh Fruits", "Organic Vegetables", "Organic Fruits"],
+    "Oil & Masala": ["Masalas", "Edible Oil & Ghee", "Spices"],
+    "Snacks": ["Chocolates", "Cookies", "Noodles"],
+}
+# Share of orders per category in the shipped dataset
+CATEGORY_SHARE = {"Bakery": 1413, "Beverages": 1400, "Eggs, Meat & Fish": 1490, "Food Grains": 1398,
+                  "Fruits & Veggies": 1418, "Oil & Masala": 1361, "Snacks": 1514}
+
+CITIES = ["Aundh", "Baner", "Bavdhan", "Bhosari", "Bibwewadi", "Camp", "Dehu Road", "Dhanori", "Hadapsar",
+          "Hinjawadi", "Koregaon Park", "Kothrud", "Lonikand", "Mulshi", "Mundhwa", "Narhe", "Pimpri-Chinchwad",
+          "Pune", "Pune Cantonment", "Pune University", "Rajgurunagar", "Sholapur", "Viman Nagar", "Wagholi"]
+REGIONS = {"West": 3203, "East": 2848, "Central": 2323, "South": 1619}
+STATE = "Maharashtra"
+
+FIRST_NAMES = ["Adavan", "Aditi", "Akash", "Alan", "Amrish", "Amy", "Anu", "Arutra", "Arvind", "Esther", "Ganesh",
+               "Hafiz", "Harish", "Haseena", "Hussain", "Jackson", "James", "Jonas", "Komal", "Krithika", "Kumar",
+               "Malik", "Mathew", "Muneer", "Peer", "Ram", "Ramesh", "Ravi", "Ridhesh", "Roshan", "Rumaiza",
+               "Sabeela", "Shah", "Sharon", "Sheeba", "Shree", "Sudeep", "Sudha", "Sundar", "Suresh", "Surya",
+               "Veena", "Verma", "Veronica", "Vidya", "Vince", "Vinne", "Willams", "Yadav", "Yusuf"]
+
+DEFAULT_CHUNK = 1_000_000
+
+
+def _weights(counts):
+    values = np.asarray(list(counts), dtype=np.float64)
+    return values / values.sum()
+
+
+def day_weights(days, growth=0.08):
+    """Relative order volume per day: yearly growth, festive-season peak and busier weekends."""
+    t = (days - days[0]).days.to_numpy() / 365.25
+    doy = days.dayofyear.to_numpy()
+    yearly = 1 + 0.25 * np.sin(2 * np.pi * (doy - 200) / 365.25)
+    festive = 1 + 0.3 * np.exp(-((doy - 305) / 20.0) ** 2)  # Diwali season
+    weekend = np.where(days.dayofweek.to_numpy() >= 5, 1.2, 1.0)
+    w = (1 + growth) ** t * yearly * festive * weekend
+    return w / w.sum()
+
+
+class SupermartGenerator:
+    """Streams synthetic Supermart orders in chunks; same seed and chunk size, same output."""
+
+    def __init__(self, rows, seed=0, customers=None, start="2021-01-01", end="2024-12-31",
+                 chunk_size=DEFAULT_CHUNK):
+        self.rows = rows
+        self.seed = seed
+        self.chunk_size = chunk_size
+        rng = np.random.default_rng([seed, 0])
+
+        # Customers: a long tail of occasional buyers and a few very regular ones
+        n_customers = customers or max(len(FIRST_NAMES), rows // 200)
+        if n_customers <= len(FIRST_NAMES):
+            names = np.array(FIRST_NAMES[:n_customers], dtype=object)
+        else:
+            names = np.array([f"{FIRST_NAMES[i % len(FIRST_NAMES)]} {i // len(FIRST_NAMES)}"
+                              for i in range(n_customers)], dtype=object)
+        popularity = 1.0 / np.arange(1, n_customers + 1) ** 0.8
+        self.customer_names = names[rng.permutation(n_customers)]
+        self.customer_weights = popularity / popularity.sum()
+        self.customer_city = rng.integers(0, len(CITIES), n_customers)
+
+        self.pairs = [(c, s) for c, subs in CATEGORIES.items() for s in subs]
+        self.pair_weights = _weights(CATEGORY_SHARE[c] / len(CATEGORIES[c]) for c, _ in self.pairs)
+        self.regions = np.array(list(REGIONS), dtype=object)
+        self.region_weights = _weights(REGIONS.values())
+
+        self.days = pd.date_range(start, end, freq="D")
+        self.day_weights = day_weights(self.days)
+
+    def chunks(self):
+        seeds = np.random.SeedSequence(self.seed).spawn((self.rows + self.chunk_size - 1) // self.chunk_size)
+        for index, chunk_seed in enumerate(seeds):
+            offset = index * self.chunk_size
+            yield self._chunk(np.random.default_rng(chunk_seed), offset, min(self.chunk_size, self.rows - offset))
+
+    def _chunk(self, rng, offset, n):
+        customer = rng.choice(len(self.customer_names), n, p=self.customer_weights)
+        pair = rng.choice(len(self.pairs), n, p=self.pair_weights)
+        # Most orders are placed in the customer's own city
+        city = np.where(rng.random(n) < 0.85, self.customer_city[customer], rng.integers(0, len(CITIES), n))
+        day = np.sort(rng.choice(len(self.days), n, p=self.day_weights))
+
+        sales = rng.integers(500, 2501, n)
+        discount = np.round(rng.uniform(0.10, 0.35, n), 2)
+        margin = rng.uniform(0.05, 0.45, n)
+        profit = np.round(sales * margin, 2)
+
+        pairs = np.array(self.pairs, dtype=object)
+        return pd.DataFrame({
+            "Order ID": "OD" + pd.Series(np.arange(offset + 1, offset + n + 1)).astype(str),
+            "Customer Name": self.customer_names[customer],
+            "Category": pairs[pair, 0],
+            "Sub Category": pairs[pair, 1],
+            "City": np.array(CITIES, dtype=object)[city],
+            "Order Date": self.days[day],
+            "Region": self.regions[rng.choice(len(self.regions), n, p=self.region_weights)],
+            "Sales": sales,
+            "Discount": discount,
+            "Profit": profit,
+            "State": STATE,
+        }, columns=COLUMNS)
+
+
+def write_csv(generator, path, date_format="%m/%d/%Y"):
+    # Format each calendar day once rather than every row
+    labels = generator.days.strftime(date_format).to_numpy(dtype=object)
+    for index, chunk in enumerate(generator.chunks()):
+        chunk["Order Date"] = labels[generator.days.get_indexer(chunk["Order Date"])]
+        chunk.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        yield len(chunk)
+
+
+def write_parquet(generator, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise SystemExit("Parquet output needs pyarrow: pip install pyarrow")
+
+    writer = None
+    try:
+        for chunk in generator.chunks():
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            writer.write_table(table)
+            yield len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic Supermart sales dataset")
+    parser.add_argument("rows", type=int)
+    parser.add_argument("out", help="Output path; .parquet writes columnar, anything else CSV")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--customers", type=int)
+    parser.add_argument("--start", default="2021-01-01")
+    parser.add_argument("--end", default="2024-12-31")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK)
+    args = parser.parse_args()
+
+    generator = SupermartGenerator(args.rows, args.seed, args.customers, args.start, args.end, args.chunk_size)
+    writer = write_parquet if os.path.splitext(args.out)[1] == ".parquet" else write_csv
+    written = 0
+    for n in writer(generator, args.out):
+        written += n
+        print(f"\r{written:,} / {args.rows:,} rows", end="", file=sys.stderr)
+    print(file=sys.stderr)
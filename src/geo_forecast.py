@@ -6,125 +6,151 @@ import pandas as pd
 import plotly.express as px
 from flask import Flask
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
+from layout_cache import cache_layout
+from data_store import get_store
+from model_registry import MODEL_REFRESHING, live_models
 
 # Flask app to manage routes
 server = Flask(__name__)
 
-def create_dash_app(server):
-    # Load the dataset
-    df = pd.read_csv(r"C:\Users\vaish\Project phase I\Supermart Grocery Sales - Retail Analytics Dataset.csv")
+HW_PARAMS = dict(trend='add', seasonal='add', seasonal_periods=12)
 
-    # Convert 'Order Date' to datetime
-    df['Order Date'] = pd.to_datetime(df['Order Date'], dayfirst=True, errors='coerce')
 
-    # Aggregate sales over time
-    sales_over_time = df.groupby('Order Date')['Sales'].sum().reset_index()
+def daily_sales(aggregates):
+    return aggregates.daily_sales.sort_index().rename_axis('Order Date').rename('Sales')
 
-    # Aggregate sales by sub-category
-    sales_by_subcategory = df.groupby('Sub Category')['Sales'].sum().reset_index()
 
-    # Aggregate sales by discount
-    sales_by_discount = df.groupby('Discount')['Sales'].sum().reset_index()
+def fit_demand_forecast(sales, **params):
+    # Demand Forecast: Using Holt-Winters Exponential Smoothing
+    model_fit = ExponentialSmoothing(sales.reset_index(drop=True), **params).fit()
+    forecast = model_fit.forecast(12)
+    forecast_dates = pd.date_range(start=sales.index.max(), periods=13, freq='ME')[1:]
+    return model_fit, pd.DataFrame({'Month': forecast_dates, 'Forecast': forecast.to_numpy()})
+
 
-    # Aggregate sales by city
-    sales_by_city = df.groupby('City')['Sales'].sum().reset_index()
+def create_dash_app(server, store=None):
+    # Running aggregates from the shared store (also built chunk by chunk in streaming mode)
+    store = store or get_store()
+    live_models.register('geo_hw', daily_sales, fit_demand_forecast, HW_PARAMS, store)
 
     # Initialize the Dash app
     app = dash.Dash(__name__, server=server, url_base_pathname='/geo_forecast/')  # '/' path for general dashboard
 
-    # Demand Forecast: Using Holt-Winters Exponential Smoothing
-    model = ExponentialSmoothing(sales_over_time['Sales'], trend='add', seasonal='add', seasonal_periods=12)
-    forecast = model.fit().forecast(12)
-    forecast_dates = pd.date_range(start=sales_over_time['Order Date'].max(), periods=13, freq='M')[1:]
-
-    # Regional Sales Map (using Plotly Express)
-    regional_sales_map = px.choropleth(df, locations="Region", color="Sales", hover_name="Region", color_continuous_scale="Viridis")
-
-    # Define the layout for sales dashboard
-    app.layout = html.Div([
-        html.H1("Supermart Sales Dashboard", style={'textAlign': 'center'}),
-
-        # Sales Over Time
-        dcc.Graph(
-            id='sales-over-time',
-            figure={
-                'data': [go.Scatter(x=sales_over_time['Order Date'], y=sales_over_time['Sales'], mode='lines')],
-                'layout': go.Layout(title='Sales Over Time')
-            }
-        ),
-
-        # Sales by Sub-Category
-        dcc.Graph(
-            id='sales-by-subcategory',
-            figure={
-                'data': [go.Bar(x=sales_by_subcategory['Sub Category'], y=sales_by_subcategory['Sales'])],
-                'layout': go.Layout(title='Sales by Sub-Category')
-            }
-        ),
-
-        # Sales by Discount
-        dcc.Graph(
-            id='sales-by-discount',
-            figure={
-                'data': [go.Scatter(x=sales_by_discount['Discount'], y=sales_by_discount['Sales'], mode='lines')],
-                'layout': go.Layout(title='Sales by Discount')
-            }
-        ),
-
-        # Demand Forecast
-        dcc.Graph(
-            id='demand-forecast',
-            figure={
-                'data': [
-                    go.Scatter(x=sales_over_time['Order Date'], y=sales_over_time['Sales'], mode='lines', name='Historical Sales'),
-                    go.Scatter(x=forecast_dates, y=forecast, mode='lines', name='Forecast')
-                ],
-                'layout': go.Layout(title='Sales Demand Forecast')
-            }
-        ),
-
-        # Regional Sales Map
-        dcc.Graph(
-            id='regional-sales-map',
-            figure=regional_sales_map
-        ),
-
-        # City Performance (Bar chart comparing cities)
-        dcc.Graph(
-            id='city-performance',
-            figure={
-                'data': [go.Bar(x=sales_by_city['City'], y=sales_by_city['Sales'])],
-                'layout': go.Layout(title='City Performance')
-            }
-        ),
-
-        # Inventory Recommendations (based on sales forecast)
-       # Inventory Recommendations (based on sales forecast)
-        html.Div([
-            html.H3("Inventory Recommendations"),
-            html.P("Based on the forecasted sales, we recommend the following inventory levels for the next 3 months:"),
-            html.Ul([
-                html.Li(f"Product {i+1}: {round(forecast.iloc[i]*1.1)} units (10% buffer)") for i in range(len(forecast))
-            ])
-        ]),
+    def build_layout():
+        # Running aggregates, kept up to date as new orders are ingested
+        aggregates = store.aggregates
+
+        # Aggregate sales over time
+        sales_over_time = daily_sales(aggregates).reset_index()
+
+        # Aggregate sales by sub-category
+        sales_by_subcategory = aggregates.frame('sub_category_sales')
+
+        # Aggregate sales by discount
+        sales_by_discount = aggregates.frame('discount_sales')
+
+        # Aggregate sales by city
+        sales_by_city = aggregates.frame('city_sales')
+
+        # Regional Sales Map (using Plotly Express)
+        regional_sales_map = px.choropleth(aggregates.frame('region_sales'), locations="Region", color="Sales", hover_name="Region", color_continuous_scale="Viridis")
+
+        # Latest demand forecast from the model registry
+        demand = live_models.forecast_or_refit('geo_hw')
+        note = ""
+        if demand is None:
+            demand, note = pd.DataFrame({'Month': [], 'Forecast': []}), f" ({MODEL_REFRESHING})"
+        forecast_dates, forecast = demand['Month'], demand['Forecast']
+
+        # Define the layout for sales dashboard
+        return html.Div([
+            html.H1("Supermart Sales Dashboard", style={'textAlign': 'center'}),
+
+            # Sales Over Time
+            dcc.Graph(
+                id='sales-over-time',
+                figure={
+                    'data': [go.Scatter(x=sales_over_time['Order Date'], y=sales_over_time['Sales'], mode='lines')],
+                    'layout': go.Layout(title='Sales Over Time')
+                }
+            ),
+
+            # Sales by Sub-Category
+            dcc.Graph(
+                id='sales-by-subcategory',
+                figure={
+                    'data': [go.Bar(x=sales_by_subcategory['Sub Category'], y=sales_by_subcategory['Sales'])],
+                    'layout': go.Layout(title='Sales by Sub-Category')
+                }
+            ),
+
+            # Sales by Discount
+            dcc.Graph(
+                id='sales-by-discount',
+                figure={
+                    'data': [go.Scatter(x=sales_by_discount['Discount'], y=sales_by_discount['Sales'], mode='lines')],
+                    'layout': go.Layout(title='Sales by Discount')
+                }
+            ),
+
+            # Demand Forecast
+            dcc.Graph(
+                id='demand-forecast',
+                figure={
+                    'data': [
+                        go.Scatter(x=sales_over_time['Order Date'], y=sales_over_time['Sales'], mode='lines', name='Historical Sales'),
+                        go.Scatter(x=forecast_dates, y=forecast, mode='lines', name='Forecast')
+                    ],
+                    'layout': go.Layout(title='Sales Demand Forecast' + note)
+                }
+            ),
+
+            # Regional Sales Map
+            dcc.Graph(
+                id='regional-sales-map',
+                figure=regional_sales_map
+            ),
+
+            # City Performance (Bar chart comparing cities)
+            dcc.Graph(
+                id='city-performance',
+                figure={
+                    'data': [go.Bar(x=sales_by_city['City'], y=sales_by_city['Sales'])],
+                    'layout': go.Layout(title='City Performance')
+                }
+            ),
+
+            # Inventory Recommendations (based on sales forecast)
+           # Inventory Recommendations (based on sales forecast)
+            html.Div([
+                html.H3("Inventory Recommendations"),
+                html.P("Based on the forecasted sales, we recommend the following inventory levels for the next 3 months:"
+                       + note),
+                html.Ul([
+                    html.Li(f"Product {i+1}: {round(forecast.iloc[i]*1.1)} units (10% buffer)") for i in range(len(forecast))
+                ])
+            ]),
 
 
-        # What-If Scenarios (Different discount strategies)
-        html.Div([
-            html.H3("What-If Scenarios"),
-            html.P("Simulating sales with different discount rates:"),
+            # What-If Scenarios (Different discount strategies)
             html.Div([
-                dcc.Slider(
-                    id='discount-slider',
-                    min=0,
-                    max=50,
-                    step=5,
-                    value=10,
-                    marks={i: f"{i}%" for i in range(0, 51, 5)},
-                ),
-                html.Div(id='discount-output')
+                html.H3("What-If Scenarios"),
+                html.P("Simulating sales with different discount rates:"),
+                html.Div([
+                    dcc.Slider(
+                        id='discount-slider',
+                        min=0,
+                        max=50,
+                        step=5,
+                        value=10,
+                        marks={i: f"{i}%" for i in range(0, 51, 5)},
+                    ),
+                    html.Div(id='discount-output')
+                ])
             ])
         ])
-    ])
+
+    # Rebuilt only when new orders arrive or the model registry swaps in a new forecast
+    cache_layout(app, version=lambda: (store.version, live_models.version), build=build_layout)
 
     return app
@@ -0,0 +1,34 @@
+import gc
+import os
+
+# All settings can be overridden from the environment (or gunicorn's own CLI flags)
+bind = os.environ.get("WEB_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_WORKERS", min(os.cpu_count() or 1, 8)))
+threads = int(os.environ.get("WEB_THREADS", 8))
+worker_class = "gthread"
+timeout = int(os.environ.get("WEB_TIMEOUT", 120))
+graceful_timeout = 30
+# Recycled workers are re-forked from the master, so they start with the data already loaded
+max_requests = int(os.environ.get("WEB_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Load wsgi.py (data + models) once in the master, then fork
+preload_app = True
+wsgi_app = "wsgi:app"
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's reach; otherwise the
+    # first GC pass in each worker touches, and so copies, most shared pages
+    gc.freeze()
+    # One set of background job workers for the whole box (see jobs.py)
+    import jobs
+    jobs.launch()
+    server.log.info("Preloaded data frozen; forking %s workers x %s threads", workers, threads)
+
+
+def post_fork(server, worker):
+    # Connections and threads do not survive fork; each worker opens its own
+    import app
+    app.connect_users()
+    app.start_background()
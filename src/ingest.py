@@ -0,0 +1,119 @@
+import io
+import json
+import os
+import threading
+import pandas as pd
+
+# Directory watched for appended order files (*.csv / *.jsonl); empty disables it
+INGEST_DIR = os.environ.get("SUPERMART_INGEST_DIR")
+INGEST_INTERVAL = float(os.environ.get("SUPERMART_INGEST_INTERVAL", 60))
+
+_drop_lock = threading.Lock()
+
+
+def records_to_frame(payload):
+    # Accepts a list of order dicts or {"orders": [...]}
+    if isinstance(payload, dict):
+        payload = payload.get("orders", [])
+    return pd.DataFrame.from_records(payload)
+
+
+def csv_to_frame(text):
+    return pd.read_csv(io.StringIO(text))
+
+
+def drop_orders(batch, directory=INGEST_DIR):
+    """Append a batch to this process's JSONL file in the ingest directory.
+
+    Every web worker's FileIngestor (and the refit job) reads the same files,
+    so pushed orders reach all of them within one ingest interval.
+    """
+    path = os.path.join(directory, f"pushed-{os.getpid()}.jsonl")
+    lines = batch.to_json(orient="records", lines=True, date_format="iso")
+    with _drop_lock, open(path, "a", encoding="utf-8") as f:
+        f.write(lines if lines.endswith("\n") else lines + "\n")
+    return len(batch)
+
+
+class FileIngestor:
+    """Feeds rows appended to CSV/JSONL files in a directory into the store.
+
+    Only bytes past the last complete line seen are read, so each poll costs
+    the size of the new rows, not the size of the file.
+    """
+
+    def __init__(self, store, directory=INGEST_DIR, interval=INGEST_INTERVAL):
+        self.store = store
+        self.directory = directory
+        self.interval = interval
+        self.offsets = {}
+        self.headers = {}
+        self.rows_ingested = 0
+        self.rows_rejected = 0
+        self._stop = threading.Event()
+
+    def _read_new(self, path):
+        # (new rows, offset just past them); the offset is only kept once they are appended
+        offset = self.offsets.get(path, 0)
+        with open(path, "rb") as f:
+            if path.endswith(".csv") and path not in self.headers:
+                self.headers[path] = f.readline()
+                offset = max(offset, f.tell())
+            f.seek(offset)
+            chunk = f.read()
+        # Leave a half-written last line for the next poll
+        end = chunk.rfind(b"\n") + 1
+        if end == 0:
+            return None, offset
+        chunk = chunk[:end]
+
+        try:
+            if path.endswith(".jsonl"):
+                records = [json.loads(line) for line in chunk.decode("utf-8").splitlines() if line.strip()]
+                return records_to_frame(records), offset + end
+            return pd.read_csv(io.BytesIO(self.headers[path] + chunk), encoding="utf-8-sig"), offset + end
+        except ValueError as exc:
+            # Malformed lines are skipped so they cannot block the rows written after them
+            print(f"Ingestion of {os.path.basename(path)} skipped {end:,} unreadable bytes: {exc}")
+            return None, offset + end
+
+    def poll(self):
+        added = 0
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith((".csv", ".jsonl")):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                batch, offset = self._read_new(path)
+            except OSError as exc:
+                # Gone or unreadable for now: tried again on the next poll
+                print(f"Ingestion of {name} failed: {exc}")
+                continue
+            if batch is not None and not batch.empty:
+                try:
+                    appended = self.store.append(batch)
+                except (KeyError, ValueError) as exc:
+                    # The store is unchanged; the batch is skipped so it cannot block every later poll
+                    print(f"Ingestion of {name} rejected {len(batch):,} rows: {exc}")
+                    self.rows_rejected += len(batch)
+                else:
+                    added += appended
+                    self.rows_ingested += appended
+            self.offsets[path] = offset
+        return added
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except (OSError, ValueError, KeyError) as exc:
+                print(f"Ingestion failed: {exc}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        thread = threading.Thread(target=self.run, name="order-ingest", daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self._stop.set()
@@ -0,0 +1,236 @@
+import argparse
+import atexit
+import hashlib
+import importlib
+import json
+import multiprocessing
+import os
+import pickle
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+# One SQLite file per box is the whole broker; every web worker and job worker opens it
+JOB_DB = os.environ.get("JOB_DB", os.path.join(tempfile.gettempdir(), "supermart_jobs.sqlite"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", 24 * 3600))
+JOB_POLL_INTERVAL = float(os.environ.get("JOB_POLL_INTERVAL", 0.5))
+
+QUEUED, RUNNING, CANCELLING = "queued", "running", "cancelling"
+DONE, FAILED, CANCELLED = "done", "failed", "cancelled"
+ACTIVE = (QUEUED, RUNNING, CANCELLING)
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Progress:
+    """Handed to job functions as `progress`; call it to report and to honour cancellation."""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+
+    def __call__(self, fraction, message=""):
+        with self.queue._connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ?, message = ? WHERE id = ?",
+                         (float(fraction), str(message), self.job_id))
+            status = conn.execute("SELECT status FROM jobs WHERE id = ?", (self.job_id,)).fetchone()[0]
+        if status == CANCELLING:
+            raise JobCancelled(self.job_id)
+
+
+class JobQueue:
+    """SQLite-backed job queue; results are cached by function and arguments."""
+
+    def __init__(self, path=JOB_DB, result_ttl=JOB_RESULT_TTL):
+        self.path = path
+        self.result_ttl = result_ttl
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, func TEXT, args BLOB, status TEXT, progress REAL, message TEXT, "
+                "result BLOB, error TEXT, worker INTEGER, created REAL, started REAL, finished REAL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    @staticmethod
+    def make_id(func, args, kwargs):
+        payload = json.dumps([func, args, kwargs], sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def submit(self, func, *args, **kwargs):
+        """Queue func(*args, **kwargs, progress=...) unless the same call is queued, running or cached.
+
+        func is a "module:function" path so worker processes can import it.
+        """
+        job_id = self.make_id(func, args, kwargs)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT status, finished FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is not None:
+                status, finished = row
+                if status in ACTIVE or (status == DONE and now - finished <= self.result_ttl):
+                    return job_id
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, func, args, status, progress, message, result, error, "
+                "worker, created, started, finished) VALUES (?, ?, ?, ?, 0, '', NULL, NULL, NULL, ?, NULL, NULL)",
+                (job_id, func, pickle.dumps((args, kwargs), protocol=pickle.HIGHEST_PROTOCOL), QUEUED, now),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT status, progress, message, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        status, progress, message, result, error = row
+        return {
+            "id": job_id,
+            "status": status,
+            "progress": progress,
+            "message": message,
+            "result": pickle.loads(result) if result is not None else None,
+            "error": error,
+        }
+
+    def cancel(self, job_id):
+        # Queued jobs are dropped at once; running ones stop at their next progress() call
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET status = ?, finished = ? WHERE id = ? AND status = ?",
+                         (CANCELLED, time.time(), job_id, QUEUED))
+            conn.execute("UPDATE jobs SET status = ? WHERE id = ? AND status = ?", (CANCELLING, job_id, RUNNING))
+
+    def claim(self, worker):
+        # BEGIN IMMEDIATE takes the write lock first, so two workers never claim the same job
+        conn = self._connect()
+        conn.isolation_level = None
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, func, args FROM jobs WHERE status = ? ORDER BY created LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is not None:
+                conn.execute("UPDATE jobs SET status = ?, worker = ?, started = ? WHERE id = ?",
+                             (RUNNING, worker, time.time(), row[0]))
+            conn.execute("COMMIT")
+            return row
+        finally:
+            conn.close()
+
+    def finish(self, job_id, status, result=None, error=None):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = ?, finished = ? WHERE id = ?",
+                (status, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL) if status == DONE else None,
+                 error, 1.0 if status == DONE else None, time.time(), job_id),
+            )
+
+    def recover(self):
+        # Jobs left running by a worker that died go back in the queue
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, worker FROM jobs WHERE status IN (?, ?)", (RUNNING, CANCELLING)).fetchall()
+            for job_id, worker in rows:
+                if worker is None or not _alive(worker):
+                    conn.execute("UPDATE jobs SET status = ?, worker = NULL WHERE id = ?", (QUEUED, job_id))
+            conn.execute("DELETE FROM jobs WHERE status NOT IN (?, ?, ?) AND finished < ?",
+                         (QUEUED, RUNNING, CANCELLING, time.time() - self.result_ttl))
+
+    def stats(self):
+        with self._connect() as conn:
+            return dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _resolve(path):
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def work(path=JOB_DB, poll_interval=JOB_POLL_INTERVAL):
+    """Job worker loop: claim, run, store the result, repeat."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    queue = JobQueue(path)
+    queue.recover()
+    pid = os.getpid()
+    while True:
+        job = queue.claim(pid)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        job_id, func, args = job
+        try:
+            args, kwargs = pickle.loads(args)
+            result = _resolve(func)(*args, progress=Progress(queue, job_id), **kwargs)
+        except JobCancelled:
+            queue.finish(job_id, CANCELLED)
+        except Exception:
+            queue.finish(job_id, FAILED, error=traceback.format_exc(limit=5))
+        else:
+            queue.finish(job_id, DONE, result)
+
+
+def launch(count=JOB_WORKERS, path=JOB_DB):
+    """Run `python jobs.py` beside the web server; it is stopped when this process exits.
+
+    A separate interpreter keeps job workers from re-importing (and rebuilding)
+    the web app the way multiprocessing's spawn would.
+    """
+    if count <= 0:
+        return None
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), "--workers", str(count), "--db", path],
+                               cwd=os.path.dirname(os.path.abspath(__file__)))
+    atexit.register(process.terminate)
+    return process
+
+
+def start_workers(count=JOB_WORKERS, path=JOB_DB):
+    # Spawned, not forked: workers start clean and load what their jobs need. Not daemonic,
+    # since jobs may open their own process pools (forecast_wide); the caller terminates them
+    context = multiprocessing.get_context("spawn")
+    workers = []
+    for i in range(count):
+        process = context.Process(target=work, args=(path,), name=f"job-worker-{i}")
+        process.start()
+        workers.append(process)
+    return workers
+
+
+job_queue = JobQueue()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background job workers for the dashboards")
+    parser.add_argument("--workers", type=int, default=JOB_WORKERS)
+    parser.add_argument("--db", default=JOB_DB)
+    args = parser.parse_args()
+
+    processes = start_workers(args.workers, args.db)
+    print(f"{len(processes)} job workers on {args.db}")
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        for process in processes:
+            process.join()
+    except (KeyboardInterrupt, SystemExit):
+        for process in processes:
+            process.terminate()
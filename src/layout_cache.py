@@ -0,0 +1,107 @@
+import gzip
+import hashlib
+import threading
+import time
+from email.utils import formatdate
+from flask import Response, request
+
+try:
+    import brotli
+except ImportError:  # optional; gzip is always available
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 9
+
+
+class CachedLayout:
+    """One serialized `_dash-layout` body per data version, kept pre-compressed.
+
+    Responses carry a content ETag and Last-Modified, so browsers revalidate
+    with a 304 instead of downloading the figures again.
+    """
+
+    def __init__(self, dash_app, version=None):
+        self.endpoint = dash_app.config.routes_pathname_prefix + "_dash-layout"
+        self.server = dash_app.server
+        self.render = self.server.view_functions[self.endpoint]
+        self.version = version or (lambda: 0)
+        self._entry = None
+        self._lock = threading.Lock()
+        self.server.view_functions[self.endpoint] = self.serve
+
+    def _build(self, version):
+        body = self.render().get_data()
+        encoded = {"identity": body, "gzip": gzip.compress(body, GZIP_LEVEL, mtime=0)}
+        if brotli is not None:
+            encoded["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+        built = int(time.time())
+        return {
+            "version": version,
+            "etag": hashlib.sha1(body).hexdigest(),
+            "built": built,
+            "last_modified": formatdate(built, usegmt=True),
+            "bodies": encoded,
+        }
+
+    def entry(self):
+        version = self.version()
+        entry = self._entry
+        if entry is None or entry["version"] != version:
+            with self._lock:
+                if self._entry is None or self._entry["version"] != version:
+                    self._entry = self._build(version)
+                entry = self._entry
+        return entry
+
+    def sizes(self):
+        entry = self._entry
+        return {name: len(body) for name, body in entry["bodies"].items()} if entry else {}
+
+    def serve(self):
+        entry = self.entry()
+        headers = {
+            "ETag": '"' + entry["etag"] + '"',
+            "Last-Modified": entry["last_modified"],
+            "Cache-Control": "no-cache",  # always revalidate, usually with a 304
+            "Vary": "Accept-Encoding",
+        }
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(entry["etag"])
+        else:
+            since = request.if_modified_since
+            not_modified = since is not None and since.timestamp() >= entry["built"]
+        if not_modified:
+            return Response(status=304, headers=headers)
+
+        accepted = request.accept_encodings
+        for encoding in ("br", "gzip"):
+            if encoding in entry["bodies"] and accepted[encoding]:
+                headers["Content-Encoding"] = encoding
+                break
+        else:
+            encoding = "identity"
+        return Response(entry["bodies"][encoding], mimetype="application/json", headers=headers)
+
+
+def versioned_layout(build, version):
+    # A dash_app.layout function that calls build() once per version(), not on every page load
+    state = {"version": None, "layout": None}
+    lock = threading.Lock()
+
+    def serve_layout():
+        current = version()
+        with lock:
+            if state["layout"] is None or state["version"] != current:
+                state["version"], state["layout"] = current, build()
+            return state["layout"]
+
+    return serve_layout
+
+
+def cache_layout(dash_app, version=None, build=None):
+    # version: callable returning the data version the layout depends on (None for static layouts);
+    # build: builds the layout, installed as dash_app.layout and rebuilt only when version() changes
+    if build is not None:
+        dash_app.layout = versioned_layout(build, version or (lambda: 0))
+    return CachedLayout(dash_app, version)
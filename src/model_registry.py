@@ -0,0 +1,225 @@
+import glob
+import hashlib
+import os
+import pickle
+import threading
+import time
+import numpy as np
+import pandas as pd
+from data_store import DATA_PATH, get_store
+from jobs import job_queue
+
+# Fitted models and their forecasts, one pickle per (model, data, parameters)
+MODEL_REGISTRY = os.environ.get("MODEL_REGISTRY", os.path.join(os.path.dirname(DATA_PATH), "models"))
+# Seconds between background refreshes; 0 turns the refresher off
+MODEL_REFRESH_INTERVAL = float(os.environ.get("MODEL_REFRESH_INTERVAL", 900))
+# Shorter wait between refreshes while a model is missing or stale, so a finished refit shows up soon
+MODEL_RETRY_INTERVAL = float(os.environ.get("MODEL_RETRY_INTERVAL", 60))
+MODEL_KEEP = int(os.environ.get("MODEL_KEEP", 3))
+# Job that refits every model for the current data (see pipeline.refit_models)
+REFIT_JOB = "pipeline:refit_models"
+# Shown in place of a forecast the registry does not have yet
+MODEL_REFRESHING = "model refreshing, check back shortly"
+
+
+class ModelUnavailable(LookupError):
+    """No artifact of this model in the registry yet, and fitting was not allowed."""
+
+
+def fingerprint(*parts):
+    h = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, (pd.DataFrame, pd.Series)):
+            h.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+            h.update(repr(list(part.columns) if isinstance(part, pd.DataFrame) else part.name).encode("utf-8"))
+        elif isinstance(part, np.ndarray):
+            h.update(part.tobytes())
+        else:
+            h.update(repr(part).encode("utf-8"))
+    return h.hexdigest()
+
+
+class ModelRegistry:
+    """On-disk artifacts keyed by model name, training-data hash and hyperparameters."""
+
+    def __init__(self, directory=MODEL_REGISTRY, keep=MODEL_KEEP):
+        self.directory = directory
+        self.keep = keep
+
+    def path(self, name, key):
+        return os.path.join(self.directory, name, f"{key}.pkl")
+
+    def load(self, name, key):
+        try:
+            with open(self.path(name, key), "rb") as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def save(self, name, key, artifact):
+        path = self.path(name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        # Keep the few newest artifacts per model for rollback, drop the rest
+        older = sorted(glob.glob(os.path.join(glob.escape(os.path.dirname(path)), "*.pkl")), key=os.path.getmtime)
+        for old in older[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+        return path
+
+    def latest(self, name):
+        # Newest artifact of any key, for fits that continue from the previous model
+        paths = glob.glob(os.path.join(glob.escape(os.path.join(self.directory, name)), "*.pkl"))
+        for path in sorted(paths, key=os.path.getmtime, reverse=True):
+            artifact = self.load(name, os.path.splitext(os.path.basename(path))[0])
+            if artifact is not None:
+                return artifact
+        return None
+
+    def get_or_fit(self, name, data, params, fit, warm_start=False):
+        """Artifact dict for this data and params; fit(data, **params) -> (model, forecast) only runs on a miss.
+
+        With warm_start, fit is also given previous= the newest artifact of this model (or None).
+        """
+        key = fingerprint(name, params, data)
+        artifact = self.load(name, key)
+        if artifact is None:
+            start = time.perf_counter()
+            if warm_start:
+                model, forecast = fit(data, previous=self.latest(name), **params)
+            else:
+                model, forecast = fit(data, **params)
+            artifact = {"name": name, "key": key, "params": params, "model": model, "forecast": forecast,
+                        "fitted_at": time.time(), "fit_seconds": round(time.perf_counter() - start, 3)}
+            try:
+                self.save(name, key, artifact)
+            except OSError as exc:
+                print(f"Model {name} not saved: {exc}")
+        return artifact
+
+
+class LiveModels:
+    """The forecasts the dashboards are showing right now.
+
+    Sub-apps register how to build their training data and fit their model.
+    refresh() resolves every model against the registry and then replaces the
+    whole set in one assignment, so readers never see a half-updated mix.
+    Nothing fits unless asked to (fit=True, the refit job): web processes only
+    load artifacts, and the background refresher reloads the newest ones and
+    queues one refit job per data version for the box.
+    """
+
+    def __init__(self, registry=None, store_getter=get_store):
+        # store_getter serves models registered without an explicit store
+        self.registry = registry or ModelRegistry()
+        self.store_getter = store_getter
+        self.specs = {}
+        self.current = {}
+        self.version = 0
+        self.last_refresh = None
+        self.stale = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def register(self, name, prepare, fit, params=None, store=None, warm_start=False):
+        # prepare(aggregates) -> training data; fit(data, **params) -> (model, forecast)
+        self.specs[name] = (store, prepare, fit, dict(params or {}), warm_start)
+
+    def _resolve(self, name, fit=False):
+        # fit=False: the artifact for the current data if there is one, else the newest, else None
+        store, prepare, fit_model, params, warm_start = self.specs[name]
+        aggregates = (store or self.store_getter()).aggregates
+        data = prepare(aggregates)
+        key = fingerprint(name, params, data)
+        if fit:
+            artifact = self.registry.get_or_fit(name, data, params, fit_model, warm_start)
+        else:
+            artifact = self.registry.load(name, key) or self.registry.latest(name)
+        if artifact is None or artifact["key"] != key:
+            self.stale.add(name)
+        else:
+            self.stale.discard(name)
+        return artifact
+
+    def get(self, name, fit=False):
+        current = self.current
+        if name not in current:
+            with self._lock:
+                if name not in self.current:
+                    artifact = self._resolve(name, fit)
+                    if artifact is None:
+                        raise ModelUnavailable(f"No {name} forecast has been fitted yet.")
+                    self.current = dict(self.current, **{name: artifact})
+                current = self.current
+        return current[name]
+
+    def forecast(self, name, fit=False):
+        return self.get(name, fit)["forecast"]
+
+    def forecast_or_refit(self, name):
+        # For layouts: None while the registry has nothing yet, with the refit job queued
+        try:
+            return self.forecast(name)
+        except ModelUnavailable:
+            self.request_refit()
+            return None
+
+    def refresh(self, fit=False):
+        """Load (or with fit, fit) every registered model for the current data; swap only if something changed."""
+        fresh = {}
+        for name in list(self.specs):
+            artifact = self._resolve(name, fit) or self.current.get(name)
+            if artifact is not None:
+                fresh[name] = artifact
+        with self._lock:
+            changed = {n: a["key"] for n, a in fresh.items()} != {n: a["key"] for n, a in self.current.items()}
+            if changed:
+                self.current = fresh
+                self.version += 1
+            self.last_refresh = time.time()
+        return changed
+
+    def request_refit(self):
+        # Deduplicated on the data version, so many web workers asking still queue one fit
+        return job_queue.submit(REFIT_JOB, self.store_getter().data_version)
+
+    def waiting(self):
+        return bool(self.stale) or any(name not in self.current for name in self.specs)
+
+    def _run(self, interval):
+        while not self._stop.wait(min(interval, MODEL_RETRY_INTERVAL) if self.waiting() else interval):
+            try:
+                self.refresh()
+                if self.waiting():
+                    self.request_refit()
+            except Exception as exc:  # keep serving the previous models
+                print(f"Model refresh failed: {exc!r}")
+
+    def start(self, interval=MODEL_REFRESH_INTERVAL):
+        if interval <= 0 or (self._thread is not None and self._thread.is_alive()):
+            return None
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), name="model-refresh", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self):
+        self._stop.set()
+
+    def status(self):
+        return {
+            "version": self.version,
+            "last_refresh": self.last_refresh,
+            "stale": sorted(self.stale),
+            "models": {n: {"key": a["key"][:12], "fitted_at": a["fitted_at"], "fit_seconds": a["fit_seconds"]}
+                       for n, a in self.current.items()},
+        }
+
+
+live_models = LiveModels()
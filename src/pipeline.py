@@ -0,0 +1,269 @@
+import argparse
+import glob
+import json
+import os
+import pickle
+import sys
+import time
+import pandas as pd
+import snapshot
+from aggregates import SalesAggregates
+from data_store import AGGREGATE_COLUMNS, COMPACT, DATA_PATH, SalesDataStore, read_source
+from ingest import INGEST_DIR, FileIngestor
+from model_registry import MODEL_KEEP, LiveModels, ModelRegistry, fingerprint
+import category_predictions
+import dashboard
+import forecast_api
+import geo_forecast
+
+# Stage outputs (one pickle per stage and input hash) and the exported forecasts;
+# both default to directories beside the data file
+PIPELINE_DIR = os.environ.get("PIPELINE_DIR")
+PIPELINE_EXPORT = os.environ.get("PIPELINE_EXPORT")
+PIPELINE_KEEP = int(os.environ.get("PIPELINE_KEEP", MODEL_KEEP))
+
+# Bump when a stage's code changes what it produces
+STAGE_VERSION = 3
+
+# The dashboards' own models: prepare(aggregates) -> training data, fit(data, **params) -> (model, forecast)
+MODELS = {
+    "dashboard_hw": (dashboard.monthly_totals, dashboard.fit_monthly_forecast, dashboard.HW_PARAMS),
+    "geo_hw": (geo_forecast.daily_sales, geo_forecast.fit_demand_forecast, geo_forecast.HW_PARAMS),
+    "category_hw": (category_predictions.monthly_sales_frame, category_predictions.fit_hw_forecast,
+                    category_predictions.HW_PARAMS),
+    "category_xgb": (category_predictions.series_frame, category_predictions.fit_xgb_forecast,
+                     category_predictions.XGB_PARAMS),
+    forecast_api.SERIES_MODEL: (forecast_api.series_sales, forecast_api.fit_series_forecasts, forecast_api.SERIES_PARAMS),
+}
+
+# Models whose fit continues from the previous artifact when only new months arrived
+WARM_START = {"category_xgb"}
+
+DATE_COLUMNS = ("Month", "YearMonth_dt", "Order Date")
+VALUE_COLUMNS = ("Forecasted Sales", "Forecast", "Predicted_Sales")
+SERIES_COLUMNS = ["Category", "Sub Category", "City"]
+
+
+class Stage:
+    def __init__(self, name, run, deps=(), params=None):
+        # run(*outputs of deps) -> output; params only feed the cache key
+        self.name = name
+        self.run = run
+        self.deps = list(deps)
+        self.params = params or {}
+
+
+class Pipeline:
+    """Runs stages in dependency order, skipping any whose inputs and parameters are unchanged.
+
+    A stage's key hashes its name, parameters and the keys of the stages it
+    reads, so keys are known before anything runs: an unchanged pipeline
+    only hashes the source file, and a change reruns the stages downstream of it.
+    """
+
+    def __init__(self, directory, keep=PIPELINE_KEEP, force=(), log=sys.stderr):
+        self.directory = directory
+        self.keep = keep
+        self.force = set(force)
+        self.log = log
+        self.stages = {}
+        self.keys = {}
+        self.outputs = {}
+        self.report = []
+
+    def add(self, stage):
+        self.stages[stage.name] = stage
+        return stage
+
+    def key(self, name):
+        if name not in self.keys:
+            stage = self.stages[name]
+            self.keys[name] = fingerprint(name, STAGE_VERSION, stage.params, [self.key(d) for d in stage.deps])
+        return self.keys[name]
+
+    def path(self, name):
+        return os.path.join(self.directory, name, f"{self.key(name)}.pkl")
+
+    def cached(self, name):
+        return name not in self.force and os.path.exists(self.path(name))
+
+    def output(self, name):
+        if name in self.outputs:
+            return self.outputs[name]
+        path = self.path(name)
+        if self.cached(name):
+            with open(path, "rb") as f:
+                result = pickle.load(f)
+            self._note(name, "cached", 0.0)
+        else:
+            stage = self.stages[name]
+            inputs = [self.output(d) for d in stage.deps]
+            start = time.perf_counter()
+            result = stage.run(*inputs)
+            self._save(path, result)
+            self._note(name, "ran", time.perf_counter() - start)
+        self.outputs[name] = result
+        return result
+
+    def _note(self, name, status, seconds):
+        self.report.append({"stage": name, "status": status, "key": self.key(name)[:12], "seconds": round(seconds, 3)})
+        print(f"{name:<24} {status:<7} {self.key(name)[:12]} {seconds:8.2f}s", file=self.log)
+
+    def _save(self, path, result):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        older = sorted(glob.glob(os.path.join(glob.escape(os.path.dirname(path)), "*.pkl")), key=os.path.getmtime)
+        for old in older[:-self.keep]:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+
+    def plan(self, targets):
+        # Stages that would run for these targets, in order; cached ones stop the walk upstream
+        order, seen = [], set()
+
+        def visit(name):
+            if name in seen:
+                return
+            seen.add(name)
+            if self.cached(name):
+                return
+            for dep in self.stages[name].deps:
+                visit(dep)
+            order.append(name)
+
+        for target in targets:
+            visit(target)
+        return order
+
+
+def tidy_forecast(name, forecast):
+    # One long table for every model: Model, [Category, Sub Category, City], Month, Forecast
+    if forecast.columns.name == "Month":  # wide: one row per series, one column per month
+        forecast = forecast.stack().rename("Forecast").reset_index()
+    df = forecast.reset_index() if isinstance(forecast.index, pd.DatetimeIndex) else forecast.copy()
+    if "index" in df.columns:
+        df = df.rename(columns={"index": "Month"})
+    date = next(c for c in DATE_COLUMNS if c in df.columns)
+    value = next(c for c in VALUE_COLUMNS if c in df.columns)
+    keys = [c for c in SERIES_COLUMNS if c in df.columns]
+    out = df[keys + [date, value]].rename(columns={date: "Month", value: "Forecast"})
+    out.insert(0, "Model", name)
+    return out
+
+
+def build(path=DATA_PATH, models=None, params=None, compact=COMPACT, registry=None, out=PIPELINE_EXPORT,
+          directory=PIPELINE_DIR, force=()):
+    """load -> clean -> aggregate -> features/<model> -> fit/<model> -> forecast -> export."""
+    registry = registry or ModelRegistry()
+    params = params or {}
+    beside = os.path.dirname(os.path.abspath(path))
+    directory = directory or os.path.join(beside, "pipeline")
+    out = out or os.path.join(beside, "forecasts")
+    pipeline = Pipeline(directory, force=force)
+
+    # The source is identified by its content, so a touched but unchanged file is still a hit
+    source = snapshot.content_hash(path)
+    pipeline.add(Stage("load", lambda: read_source(path), params={"source": source, "format": os.path.splitext(path)[1]}))
+    pipeline.add(Stage("clean", lambda raw: SalesDataStore.from_frame(raw, compact).view(),
+                       ["load"], {"compact": compact}))
+    pipeline.add(Stage("aggregate", lambda df: SalesAggregates(df[AGGREGATE_COLUMNS]), ["clean"]))
+
+    names = list(models or MODELS)
+    for name in names:
+        prepare, fit, defaults = MODELS[name]
+        model_params = dict(defaults, **params.get(name, {}))
+        pipeline.add(Stage(f"features/{name}", prepare, ["aggregate"]))
+        # Fitted models also land in the registry the dashboards load from
+        pipeline.add(Stage(f"fit/{name}", lambda data, name=name, fit=fit, p=model_params:
+                           registry.get_or_fit(name, data, p, fit, name in WARM_START),
+                           [f"features/{name}"], model_params))
+
+    def forecast(*artifacts):
+        return pd.concat([tidy_forecast(a["name"], a["forecast"]) for a in artifacts], ignore_index=True)
+
+    pipeline.add(Stage("forecast", forecast, [f"fit/{n}" for n in names]))
+
+    def export(forecasts):
+        os.makedirs(out, exist_ok=True)
+        forecasts.to_csv(os.path.join(out, "forecasts.csv"), index=False)
+        manifest = {
+            "source": path,
+            "source_hash": source,
+            "out": out,
+            "stages": {name: pipeline.key(name) for name in pipeline.stages},
+            "models": {name: dict(MODELS[name][2], **params.get(name, {})) for name in names},
+            "rows": len(forecasts),
+            "exported_at": time.time(),
+        }
+        with open(os.path.join(out, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2, default=str)
+        return manifest
+
+    pipeline.add(Stage("export", export, ["forecast"], {"out": os.path.abspath(out)}))
+    return pipeline
+
+
+def refit_models(data_version=None, progress=None):
+    """Job run once per data version (LiveModels.request_refit): fit every model into the registry.
+
+    Web processes only reload what lands there. The job sees the data file plus
+    any orders dropped in SUPERMART_INGEST_DIR.
+    """
+    store = SalesDataStore(DATA_PATH)
+    if INGEST_DIR:
+        FileIngestor(store).poll()
+    if data_version and store.data_version != data_version:
+        print(f"Refitting on {store.data_version[:12]}, not the requested {data_version[:12]}: "
+              "some orders only reached a web process", file=sys.stderr)
+    models = LiveModels(store_getter=lambda: store)
+    for name, (prepare, fit, defaults) in MODELS.items():
+        models.register(name, prepare, fit, defaults, store, name in WARM_START)
+    for i, name in enumerate(MODELS):
+        if progress is not None:
+            progress(i / len(MODELS), name)
+        models.get(name, fit=True)
+    return {name: artifact["key"][:12] for name, artifact in models.current.items()}
+
+
+def model_params(pairs):
+    # ["category_xgb.n_estimators=200", ...] -> {"category_xgb": {"n_estimators": 200}}
+    params = {}
+    for pair in pairs:
+        target, _, value = pair.partition("=")
+        name, _, param = target.partition(".")
+        if name not in MODELS or not param or not value:
+            raise SystemExit(f"Bad --set {pair!r}; expected <model>.<param>=<value> with model in {sorted(MODELS)}")
+        try:
+            value = json.loads(value)
+        except ValueError:
+            pass
+        params.setdefault(name, {})[param] = value
+    return params
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute the dashboards' forecasts, reusing unchanged stages")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--models", nargs="+", choices=sorted(MODELS), default=list(MODELS))
+    parser.add_argument("--set", nargs="*", default=[], metavar="MODEL.PARAM=VALUE",
+                        help="override a model hyperparameter, e.g. category_xgb.n_estimators=200")
+    parser.add_argument("--compact", action="store_true", default=COMPACT)
+    parser.add_argument("--force", nargs="*", default=[], metavar="STAGE", help="rerun these stages even if cached")
+    parser.add_argument("--cache", default=PIPELINE_DIR)
+    parser.add_argument("--out", default=PIPELINE_EXPORT)
+    parser.add_argument("--dry-run", action="store_true", help="list the stages that would run and stop")
+    args = parser.parse_args()
+
+    pipeline = build(args.data, args.models, model_params(args.set), args.compact,
+                     out=args.out, directory=args.cache, force=args.force)
+    if args.dry_run:
+        print("\n".join(pipeline.plan(["export"])) or "Nothing to do")
+    else:
+        manifest = pipeline.output("export")
+        ran = [r["stage"] for r in pipeline.report if r["status"] == "ran"]
+        print(f"{len(ran)} of {len(pipeline.report)} stages ran; {manifest['rows']} forecast rows in {manifest['out']}")
@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+SCORE_LABELS = [1, 2, 3, 4, 5]
+
+# Monetary bins used by the customer insights page
+MONETARY_BINS = [0, 50, 100, 200, 500, float('inf')]
+MONETARY_LABELS = ['Very Low Spender', 'Low Spender', 'Medium Spender', 'High Spender', 'Very High Spender']
+
+
+def quintile_score(values, reverse=False):
+    # Rank first so ties and skewed distributions still fill all five buckets
+    ranks = values.rank(method='first', ascending=not reverse)
+    buckets = min(5, len(values))
+    if buckets == 0:
+        return pd.Series(dtype='int8', index=values.index)
+    return pd.qcut(ranks, buckets, labels=SCORE_LABELS[:buckets]).astype('int8')
+
+
+def segment(r_score, f_score):
+    conditions = [
+        (r_score >= 4) & (f_score >= 4),
+        (r_score <= 2) & (f_score >= 3),
+        f_score >= 4,
+        r_score >= 4,
+        r_score <= 2,
+    ]
+    choices = ['Champions', 'At Risk', 'Loyal Customers', 'Potential Loyalists', 'Hibernating']
+    return pd.Categorical(np.select(conditions, choices, default='Need Attention'))
+
+
+class RFMEngine:
+    """One row per customer: last order, order count and spend, plus RFM scores.
+
+    The running state is kept so new orders can be folded in without
+    regrouping the full history.
+    """
+
+    def __init__(self, df=None):
+        self.state = pd.DataFrame(columns=['last_order', 'frequency', 'monetary'])
+        if df is not None:
+            self.update(df)
+
+    @staticmethod
+    def aggregate(df):
+        # float64 sums, whatever width the store keeps Sales in
+        df = df.astype({'Sales': 'float64'})
+        part = df.groupby('Customer Name', observed=True).agg(
+            last_order=('Order Date', 'max'),
+            frequency=('Order ID', 'count'),
+            monetary=('Sales', 'sum'),
+        )
+        # Plain labels so batches with new customers still align
+        if isinstance(part.index, pd.CategoricalIndex):
+            part.index = part.index.astype(str)
+        return part
+
+    def update(self, df):
+        part = self.aggregate(df)
+        if self.state.empty:
+            self.state = part
+            return self
+        state = self.state.reindex(self.state.index.union(part.index))
+        part = part.reindex(state.index)
+        state['last_order'] = pd.concat([state['last_order'], part['last_order']], axis=1).max(axis=1)
+        state['frequency'] = state['frequency'].fillna(0) + part['frequency'].fillna(0)
+        state['monetary'] = state['monetary'].fillna(0) + part['monetary'].fillna(0)
+        self.state = state
+        return self
+
+    def table(self, as_of=None):
+        state = self.state
+        as_of = state['last_order'].max() if as_of is None else as_of
+        rfm = pd.DataFrame(index=state.index)
+        rfm['recency'] = (as_of - state['last_order']).dt.days
+        rfm['frequency'] = state['frequency'].astype('int64')
+        rfm['monetary'] = state['monetary']
+        rfm['r_score'] = quintile_score(rfm['recency'], reverse=True)
+        rfm['f_score'] = quintile_score(rfm['frequency'])
+        rfm['m_score'] = quintile_score(rfm['monetary'])
+        rfm['rfm_score'] = rfm['r_score'].astype('int16') * 100 + rfm['f_score'] * 10 + rfm['m_score']
+        rfm['segment'] = segment(rfm['r_score'], rfm['f_score'])
+
+        # Simple CLV as before: total spend weighted by number of purchases
+        rfm['clv'] = rfm['monetary'] * rfm['frequency']
+        rfm['monetary_segment'] = pd.cut(rfm['monetary'], bins=MONETARY_BINS, labels=MONETARY_LABELS)
+        return rfm.rename_axis('Customer Name').reset_index()
@@ -1,30 +1,94 @@
+import os
 import dash
 from dash import dcc, html, Input, Output
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from flask import Flask
 import dash_bootstrap_components as dbc
+from layout_cache import cache_layout
+from data_store import SalesDataStore, get_store
+from sales_cube import DISCOUNT_STEP, discount_bucket
+from callback_cache import callback_cache
+from backtest import load_summary
 
+# Discount-vs-Profit rendering tiers by order count: SVG markers up to
+# SCATTER_SVG_ROWS, WebGL markers up to SCATTER_WEBGL_ROWS, bins of cube cells above
+SCATTER_SVG_ROWS = int(os.environ.get("SCATTER_SVG_ROWS", 2000))
+SCATTER_WEBGL_ROWS = int(os.environ.get("SCATTER_WEBGL_ROWS", 5000))
+SCATTER_BINS = 40
+SCATTER_HOVER_TOP = 5
 
 
-def create_dash_app(server: Flask):
+def discount_profit_figure(cells, rows):
+    # cells: the cube selection; rows(): its raw orders, only read when few enough to draw.
+    # rows=None (streaming mode, where only a sample is kept) always bins the cube
+    title = "Discount Impact on Profit"
+    orders = int(cells["Orders"].sum())
+    if rows is not None and orders <= SCATTER_WEBGL_ROWS:
+        filtered_df = rows()
+        render_mode = "svg" if len(filtered_df) <= SCATTER_SVG_ROWS else "webgl"
+        return px.scatter(filtered_df, x="Discount", y="Profit",
+                          size="Sales", color="Category",
+                          title=title, render_mode=render_mode,
+                          hover_data=["City", "Sub Category"])
 
-    # Sample DataFrame (replace this with your full Supermart dataset)
-    df = pd.read_csv(r"C:\Users\vaish\Project phase I\Supermart Grocery Sales - Retail Analytics Dataset.csv")
-    # Fix datetime parsing
-    df["Order Date"] = pd.to_datetime(df["Order Date"], infer_datetime_format=True, errors="coerce")
-    df = df.dropna(subset=["Order Date"])
-    df["Year"] = df["Order Date"].dt.year
-    df["Month"] = df["Order Date"].dt.month
-    df["Weekday"] = df["Order Date"].dt.day_name()
+    if not orders:
+        return go.Figure(layout=dict(title=f"{title} (no orders)"))
 
-        
-    # Sample accuracy data
-    accuracy_percent_data = pd.DataFrame({
-        'Model': ['SARIMA', 'LSTM', 'XGBoost'],
-        'MAPE (%)': [18.45, 15.84, 13.23]  # Replace with real values
+    # Too many points for the browser: bin the cube cells (each at its mean profit
+    # per order), so no raw rows are scanned or sent
+    discount = cells["Discount Bucket"].to_numpy(dtype=np.float64) * DISCOUNT_STEP
+    profit = cells["Profit"].to_numpy(dtype=np.float64) / cells["Orders"].to_numpy(dtype=np.float64)
+    x_edges = np.linspace(discount.min(), discount.max(), SCATTER_BINS + 1)
+    y_edges = np.linspace(profit.min(), profit.max(), SCATTER_BINS + 1)
+    x_bin = np.clip(np.searchsorted(x_edges, discount, side="right") - 1, 0, SCATTER_BINS - 1)
+    y_bin = np.clip(np.searchsorted(y_edges, profit, side="right") - 1, 0, SCATTER_BINS - 1)
+
+    bins = pd.DataFrame({
+        "y": y_bin, "x": x_bin,
+        "Category": cells["Category"].to_numpy(),
+        "Sales": cells["Sales"].to_numpy(dtype=np.float64),
     })
+    by_category = bins.groupby(["y", "x", "Category"], observed=True)["Sales"].sum().reset_index()
+
+    # Bin totals, and each bin's top categories as hover text, without a loop over bins
+    totals = by_category.groupby(["y", "x"])["Sales"].sum()
+    top = by_category.sort_values(["y", "x", "Sales"], ascending=[True, True, False])
+    top = top[top.groupby(["y", "x"]).cumcount() < SCATTER_HOVER_TOP]
+    labels = top["Category"].astype(str) + ": " + top["Sales"].round().astype(np.int64).map("{:,}".format)
+    text = labels.groupby([top["y"], top["x"]]).agg("<br>".join)
+
+    z = np.full((SCATTER_BINS, SCATTER_BINS), np.nan)
+    z[totals.index.get_level_values("y"), totals.index.get_level_values("x")] = totals.to_numpy()
+    hover = np.full((SCATTER_BINS, SCATTER_BINS), "", dtype=object)
+    hover[text.index.get_level_values("y"), text.index.get_level_values("x")] = text.to_numpy()
+
+    fig = go.Figure(go.Heatmap(
+        z=z,
+        x=(x_edges[:-1] + x_edges[1:]) / 2,
+        y=(y_edges[:-1] + y_edges[1:]) / 2,
+        customdata=hover,
+        colorscale="Viridis",
+        colorbar=dict(title="Sales"),
+        hovertemplate="Discount %{x:.2f}<br>Profit %{y:,.0f}<br>Sales %{z:,.0f}<br>%{customdata}<extra></extra>",
+    ))
+    fig.update_layout(title=f"{title} ({orders:,} orders, binned)",
+                      xaxis_title="Discount", yaxis_title="Profit")
+    return fig
+
+
+def create_dash_app(server: Flask, store: SalesDataStore = None):
+
+    # Shared Supermart dataset with Year / Month / Weekday already derived
+    store = store or get_store()
+
+        
+    # Rolling-origin backtest results (refresh with `python backtest.py`)
+    accuracy_percent_data = load_summary()
+    if accuracy_percent_data is None:
+        accuracy_percent_data = pd.DataFrame(columns=['Model', 'MAPE (%)', 'RMSE', 'MAE'])
 
     # Create bar chart using Plotly Express
     fig = px.bar(
@@ -47,21 +111,20 @@ def create_dash_app(server: Flask):
         height=400
     )
     fig.update_traces(texttemplate='%{text:.2f}%', textposition='outside')
-    fig.update_yaxes(range=[0, max(accuracy_percent_data['MAPE (%)']) + 5], showgrid=True, gridwidth=1, gridcolor='LightGray')
+    fig.update_yaxes(range=[0, accuracy_percent_data['MAPE (%)'].max() + 5 if len(accuracy_percent_data) else 5], showgrid=True, gridwidth=1, gridcolor='LightGray')
 
-    metrics = ['MAE', 'RMSE', 'MAPE', 'R2 Score', 'Accuracy']
-    values = [85, 90, 88, 92, 95]  # hypothetical success rates or percentages
-
-    # Create bar chart using Plotly Graph Objects
+    # Create bar chart using Plotly Graph Objects: absolute errors per model
     bar_chart = go.Figure(
         data=[
             go.Bar(
-                x=metrics,
-                y=values,
-                text=[f'{v}%' for v in values],
+                x=accuracy_percent_data['Model'],
+                y=accuracy_percent_data[metric],
+                name=metric,
+                text=[f'{v:,.0f}' for v in accuracy_percent_data[metric]],
                 textposition='outside',
-                marker=dict(color='mediumseagreen', line=dict(color='black', width=1))
+                marker=dict(color=color, line=dict(color='black', width=1))
             )
+            for metric, color in [('RMSE', 'mediumseagreen'), ('MAE', 'steelblue')]
         ]
     )
 
@@ -72,10 +135,11 @@ def create_dash_app(server: Flask):
             x=0.5,
             font=dict(size=20, family='Arial', color='black')
         ),
-        xaxis_title='Evaluation Metrics',
-        yaxis_title='Success Rate (%)',
-        yaxis=dict(range=[80, 100], gridcolor='lightgray', tickmode='linear', dtick=2),
+        xaxis_title='Model',
+        yaxis_title='Backtest Error (Sales)',
+        yaxis=dict(gridcolor='lightgray'),
         plot_bgcolor='white',
+        barmode='group',
         bargap=0.4
     )
 
@@ -84,101 +148,108 @@ def create_dash_app(server: Flask):
     app = dash.Dash(__name__, server=server, url_base_pathname='/sales/')  # '/' path for general dashboard
 
     # -------------------- Layout --------------------
-    app.layout = dbc.Container([
-    html.H2("📊 Supermart Grocery Sales Dashboard", className="my-4 text-center fw-bold"),
-
-    # Filter Row
-    dbc.Row([
-        dbc.Col([
-            html.Label("Category", className="fw-bold"),
-            dcc.Dropdown(
-                id="category-filter",
-                options=[{"label": c, "value": c} for c in sorted(df["Category"].unique())],
-                placeholder="Select Category"
-            )
-        ], md=2),
-        dbc.Col([
-            html.Label("City", className="fw-bold"),
-            dcc.Dropdown(
-                id="city-filter",
-                options=[{"label": c, "value": c} for c in sorted(df["City"].unique())],
-                placeholder="Select City"
-            )
-        ], md=2),
-        dbc.Col([
-            html.Label("Year", className="fw-bold"),
-            dcc.Dropdown(
-                id="year-filter",
-                options=[{"label": y, "value": y} for y in sorted(df["Year"].unique())],
-                placeholder="Select Year"
-            )
-        ], md=2),
-        dbc.Col([
-            html.Label("Month", className="fw-bold"),
-            dcc.Dropdown(
-                id="month-filter",
-                options=[{"label": pd.to_datetime(str(m), format="%m").strftime("%B"), "value": m} for m in sorted(df["Month"].unique())],
-                placeholder="Select Month"
-            )
-        ], md=2),
-        dbc.Col([
-            html.Label("Discount Range", className="fw-bold"),
-            dcc.RangeSlider(
-                id="discount-filter",
-                min=0, max=1, step=0.05,
-                value=[0, 1],
-                marks={round(i * 0.1, 1): f"{int(i*10)}%" for i in range(11)}
-            )
-        ], md=4),
-    ], className="mb-4"),
-
-    html.Hr(),
-
-    # Dynamic Graph Output (Filtered Visuals)
-    dbc.Row([
-        dbc.Col([
-            dcc.Loading(
-                id="loading",
-                children=[html.Div(id="filtered-content")],
-                type="circle"
-            )
-        ])
-    ]),
+    def build_layout():
+        # Dropdown choices come from the cube, so they cover every row even in streaming mode
+        df = store.cube.cells
 
-    html.Hr(),
+        return dbc.Container([
+            html.H2("📊 Supermart Grocery Sales Dashboard", className="my-4 text-center fw-bold"),
 
-    # Static Accuracy Chart
-   # Inside your layout, just before or alongside the accuracy chart:
+            # Filter Row
+            dbc.Row([
+                dbc.Col([
+                    html.Label("Category", className="fw-bold"),
+                    dcc.Dropdown(
+                        id="category-filter",
+                        options=[{"label": c, "value": c} for c in sorted(df["Category"].unique())],
+                        placeholder="Select Category"
+                    )
+                ], md=2),
+                dbc.Col([
+                    html.Label("City", className="fw-bold"),
+                    dcc.Dropdown(
+                        id="city-filter",
+                        options=[{"label": c, "value": c} for c in sorted(df["City"].unique())],
+                        placeholder="Select City"
+                    )
+                ], md=2),
+                dbc.Col([
+                    html.Label("Year", className="fw-bold"),
+                    dcc.Dropdown(
+                        id="year-filter",
+                        options=[{"label": y, "value": y} for y in sorted(df["Year"].unique())],
+                        placeholder="Select Year"
+                    )
+                ], md=2),
+                dbc.Col([
+                    html.Label("Month", className="fw-bold"),
+                    dcc.Dropdown(
+                        id="month-filter",
+                        options=[{"label": pd.to_datetime(str(m), format="%m").strftime("%B"), "value": m} for m in sorted(df["Month"].unique())],
+                        placeholder="Select Month"
+                    )
+                ], md=2),
+                dbc.Col([
+                    html.Label("Discount Range", className="fw-bold"),
+                    dcc.RangeSlider(
+                        id="discount-filter",
+                        min=0, max=1, step=0.05,
+                        value=[0, 1],
+                        marks={round(i * 0.1, 1): f"{int(i*10)}%" for i in range(11)}
+                    )
+                ], md=4),
+            ], className="mb-4"),
 
-dbc.Row([
-    dbc.Col([
-        html.Div([
-            html.H5("Model Accuracy (MAPE %)", className="fw-bold mb-3"),
-            html.Ul([
-                html.Li("📉 SARIMA  : 18.45%", style={"fontSize": "18px"}),
-                html.Li("📊 XGBoost : 13.23%", style={"fontSize": "18px"}),
-                html.Li("🔁 LSTM    : 15.84%", style={"fontSize": "18px"}),
-            ], style={"listStyleType": "none", "paddingLeft": 0}),
-        ], className="p-3 border rounded bg-light")
-    ], md=6),
+            html.Hr(),
 
-    dbc.Col([
-        html.Label("Model Accuracy Comparison Chart", className="fw-bold"),
-        dcc.Graph(figure=fig, id="accuracy-chart")
-    ], md=6),
+            # Dynamic Graph Output (Filtered Visuals)
+            dbc.Row([
+                dbc.Col([
+                    dcc.Loading(
+                        id="loading",
+                        children=[html.Div(id="filtered-content")],
+                        type="circle"
+                    )
+                ])
+            ]),
 
-    dbc.Row([
-        dbc.Col(html.H2("Product Demand Forecast Model Performance", className="text-center mb-4"), width=12)
-    ]),
-    dbc.Row([
-        dbc.Col(dcc.Graph(figure=bar_chart), width=12)
-    ])
+            html.Hr(),
 
-])
+            # Static Accuracy Chart
+           # Inside your layout, just before or alongside the accuracy chart:
 
-], fluid=True)
+        dbc.Row([
+            dbc.Col([
+                html.Div([
+                    html.H5("Model Accuracy (MAPE %)", className="fw-bold mb-3"),
+                    html.Ul([
+                        html.Li(f"{row['Model']} : {row['MAPE (%)']:.2f}%", style={"fontSize": "18px"})
+                        for _, row in accuracy_percent_data.iterrows()
+                    ] or [html.Li("No backtest results yet. Run python backtest.py.", style={"fontSize": "18px"})],
+                        style={"listStyleType": "none", "paddingLeft": 0}),
+                ], className="p-3 border rounded bg-light")
+            ], md=6),
 
+            dbc.Col([
+                html.Label("Model Accuracy Comparison Chart", className="fw-bold"),
+                dcc.Graph(figure=fig, id="accuracy-chart")
+            ], md=6),
 
+            dbc.Row([
+                dbc.Col(html.H2("Product Demand Forecast Model Performance", className="text-center mb-4"), width=12)
+            ]),
+            dbc.Row([
+                dbc.Col(dcc.Graph(figure=bar_chart), width=12)
+            ])
+
+        ])
+
+        ], fluid=True)
+
+
+
+    # Rebuilt when new orders arrive, so their categories, cities and years are offered
+    cache_layout(app, version=lambda: store.version, build=build_layout)
 
     # -------------------- Callback --------------------
     @app.callback(
@@ -189,37 +260,42 @@ dbc.Row([
         Input("month-filter", "value"),
         Input("discount-filter", "value"),
     )
+    @callback_cache.memoize(version=lambda: store.data_version)
     def update_dashboard(category, city, year, month, discount_range):
-        # Filtering logic
-        filtered_df = df.copy()
-        if category:
-            filtered_df = filtered_df[filtered_df["Category"] == category]
-        if city:
-            filtered_df = filtered_df[filtered_df["City"] == city]
-        if year:
-            filtered_df = filtered_df[filtered_df["Year"] == year]
-        if month:
-            filtered_df = filtered_df[filtered_df["Month"] == month]
-        if discount_range:
-            filtered_df = filtered_df[
-                (filtered_df["Discount"] >= discount_range[0]) &
-                (filtered_df["Discount"] <= discount_range[1])
-            ]
+        # Aggregates come from the pre-built cube instead of scanning raw rows
+        cells = store.cube.select(category, city, year, month, discount_range)
+
+        def filtered_rows():
+            # Raw rows only for a scatter small enough to draw; one combined mask, no copy.
+            # Read from the store each time so ingested orders show up
+            df = store.view(["Category", "Sub Category", "City", "Year", "Month", "Discount", "Profit", "Sales"])
+            mask = pd.Series(True, index=df.index)
+            if category:
+                mask &= df["Category"] == category
+            if city:
+                mask &= df["City"] == city
+            if year:
+                mask &= df["Year"] == year
+            if month:
+                mask &= df["Month"] == month
+            if discount_range:
+                # Same bucket test as the cube: float32 discounts are never compared to float64 bounds
+                low, high = discount_bucket(discount_range)
+                mask &= pd.Series(discount_bucket(df["Discount"]), index=df.index).between(low, high)
+            return df[mask]
 
         # ---- Visualization 1: Sales by Sub-Category (Bar Chart) ----
-        sub_sales = filtered_df.groupby("Sub Category")["Sales"].sum().sort_values().reset_index()
+        sub_sales = cells.groupby("Sub Category", observed=True)["Sales"].sum().sort_values().reset_index()
         fig_sub = px.bar(sub_sales, x="Sales", y="Sub Category", orientation="h",
                         color="Sales", title="Sales by Sub-Category",
                         color_continuous_scale="Tealgrn")
 
         # ---- Visualization 2: Discount vs Profit (Scatter) ----
-        fig_scatter = px.scatter(filtered_df, x="Discount", y="Profit",
-                                size="Sales", color="Category",
-                                title="Discount Impact on Profit",
-                                hover_data=["City", "Sub Category"])
+        # The raw rows of a streaming store are only a sample, so it is binned from the cube
+        fig_scatter = discount_profit_figure(cells, None if store.streaming else filtered_rows)
 
         # ---- Visualization 3: Sales Heatmap (Weekday vs Month) ----
-        heatmap_data = filtered_df.groupby(["Weekday", "Month"])["Sales"].sum().unstack(fill_value=0)
+        heatmap_data = cells.groupby(["Weekday", "Month"], observed=True)["Sales"].sum().unstack(fill_value=0)
         fig_heatmap = go.Figure(data=go.Heatmap(
             z=heatmap_data.values,
             x=[pd.to_datetime(str(m), format="%m").strftime("%b") for m in heatmap_data.columns],
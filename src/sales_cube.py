@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+# Grain of the pre-aggregated cube behind the sales analysis filters
+CUBE_DIMENSIONS = ["Category", "City", "Year", "Month", "Weekday", "Sub Category", "Discount Bucket"]
+CUBE_MEASURES = ["Sales", "Profit", "Orders"]
+
+# Discounts are stored to the cent, so 0.01 buckets answer any slider range exactly
+DISCOUNT_STEP = 0.01
+
+
+def discount_bucket(discount):
+    return np.rint(np.asarray(discount, dtype=np.float64) / DISCOUNT_STEP).astype(np.int16)
+
+
+class SalesCube:
+    """Sum of Sales/Profit and order counts over every observed filter combination."""
+
+    def __init__(self, df=None):
+        self.cells = pd.DataFrame(columns=CUBE_DIMENSIONS + CUBE_MEASURES)
+        if df is not None:
+            self.update(df)
+
+    @classmethod
+    def from_cells(cls, cells):
+        cube = cls()
+        cube.cells = cells
+        return cube
+
+    @staticmethod
+    def aggregate(df):
+        # float64 sums, whatever width the store keeps the measures in
+        df = df.astype({"Sales": np.float64, "Profit": np.float64})
+        keys = [df[col] for col in CUBE_DIMENSIONS[:-1]]
+        keys.append(pd.Series(discount_bucket(df["Discount"]), index=df.index, name="Discount Bucket"))
+        return (
+            df.groupby(keys, observed=True)
+            .agg(Sales=("Sales", "sum"), Profit=("Profit", "sum"), Orders=("Sales", "size"))
+            .reset_index()
+        )
+
+    def update(self, df):
+        # Fold a batch of new rows into the cube; cost is the batch plus the cube, not the history
+        part = self.aggregate(df)
+        if self.cells.empty:
+            self.cells = part
+        else:
+            merged = pd.concat([self.cells, part], ignore_index=True)
+            self.cells = merged.groupby(CUBE_DIMENSIONS, observed=True)[CUBE_MEASURES].sum().reset_index()
+        return self
+
+    def select(self, category=None, city=None, year=None, month=None, discount_range=None):
+        cells = self.cells
+        mask = np.ones(len(cells), dtype=bool)
+        if category:
+            mask &= (cells["Category"] == category).to_numpy()
+        if city:
+            mask &= (cells["City"] == city).to_numpy()
+        if year:
+            mask &= (cells["Year"] == year).to_numpy()
+        if month:
+            mask &= (cells["Month"] == month).to_numpy()
+        if discount_range:
+            low, high = discount_bucket(discount_range)
+            bucket = cells["Discount Bucket"].to_numpy()
+            mask &= (bucket >= low) & (bucket <= high)
+        return cells[mask]
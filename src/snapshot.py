@@ -0,0 +1,102 @@
+import glob
+import hashlib
+import json
+import os
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # snapshots are an optimization; without pyarrow the CSV is parsed as before
+    pa = None
+
+# Cleaned frames are cached as Arrow IPC files beside the source (or in SUPERMART_SNAPSHOT_DIR)
+SNAPSHOT = os.environ.get("SUPERMART_SNAPSHOT", "1") == "1" and pa is not None
+SNAPSHOT_DIR = os.environ.get("SUPERMART_SNAPSHOT_DIR")
+
+# Bump when the cleaning in SalesDataStore._prepare changes what ends up in the frame
+FORMAT_VERSION = 1
+HASH_BLOCK = 8 << 20
+META_KEY = b"supermart"
+
+
+def _base(source):
+    directory = SNAPSHOT_DIR or os.path.dirname(os.path.abspath(source))
+    return os.path.join(directory, os.path.splitext(os.path.basename(source))[0])
+
+
+def content_hash(source):
+    """blake2b of the file; re-hashed only when its size or mtime changes."""
+    stat = os.stat(source)
+    stamp_path = _base(source) + ".source.json"
+    stamp = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    try:
+        with open(stamp_path) as f:
+            known = json.load(f)
+        if {k: known.get(k) for k in stamp} == stamp:
+            return known["hash"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    h = hashlib.blake2b(digest_size=16)
+    with open(source, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b""):
+            h.update(block)
+    stamp["hash"] = h.hexdigest()
+    try:
+        _write_atomic(stamp_path, lambda path: _dump_json(path, stamp))
+    except OSError:
+        pass
+    return stamp["hash"]
+
+
+def _dump_json(path, data):
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def _write_atomic(path, write):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def snapshot_path(source, digest, tag, name="frame"):
+    return f"{_base(source)}.{name}.{tag}.v{FORMAT_VERSION}.{digest}.arrow"
+
+
+def load(source, digest, tag, name="frame"):
+    """(frame, metadata) from a memory-mapped snapshot, or None if there is none."""
+    path = snapshot_path(source, digest, tag, name)
+    if not os.path.exists(path):
+        return None
+    # Primitive columns are wrapped, not copied: every process that maps the
+    # file shares the same page-cache pages
+    table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+    meta = json.loads((table.schema.metadata or {}).get(META_KEY, b"{}"))
+    df = table.to_pandas(split_blocks=True, coerce_temporal_nanoseconds=True)
+    return df, meta
+
+
+def save(source, digest, tag, df, meta=None, name="frame"):
+    path = snapshot_path(source, digest, tag, name)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), META_KEY: json.dumps(meta or {}).encode()})
+
+    def write(tmp):
+        # Uncompressed on purpose: compressed buffers cannot be memory-mapped
+        with pa.OSFile(tmp, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+    _write_atomic(path, write)
+    # Older snapshots of the same source and mode are stale now
+    for old in glob.glob(f"{glob.escape(_base(source))}.{name}.{tag}.v*.arrow"):
+        if old != path:
+            try:
+                os.remove(old)
+            except OSError:
+                pass
+    return path
@@ -0,0 +1,176 @@
+import hashlib
+import hmac
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+import numpy as np
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import DuplicateKeyError
+
+# mongomock:// runs against an in-memory stand-in (tests, benchmarks, laptops)
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://localhost:27017/")
+MONGO_DB = os.environ.get("MONGO_DB", "product_demand_forecast")
+MONGO_POOL_SIZE = int(os.environ.get("MONGO_POOL_SIZE", 20))
+MONGO_TIMEOUT_MS = int(os.environ.get("MONGO_TIMEOUT_MS", 2000))
+
+# bcrypt runs on its own small pool so a burst of logins cannot take every
+# request thread; beyond BCRYPT_QUEUE waiting checks, logins are refused
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", 2))
+BCRYPT_QUEUE = int(os.environ.get("BCRYPT_QUEUE", 64))
+BCRYPT_TIMEOUT = float(os.environ.get("BCRYPT_TIMEOUT", 10))
+
+# Authenticated principals are remembered for this long (seconds); every hit
+# still re-reads the stored hash, so this only bounds memory, not staleness
+PRINCIPAL_TTL = float(os.environ.get("USER_CACHE_TTL", 1800))
+PRINCIPAL_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+
+EMAIL_INDEX = "email_unique"
+
+
+class UserStoreBusy(RuntimeError):
+    pass
+
+
+def connect(uri=MONGO_URI):
+    if uri.startswith("mongomock://"):
+        import mongomock
+        return mongomock.MongoClient()
+    return MongoClient(
+        uri,
+        maxPoolSize=MONGO_POOL_SIZE,
+        serverSelectionTimeoutMS=MONGO_TIMEOUT_MS,
+        connectTimeoutMS=MONGO_TIMEOUT_MS,
+        socketTimeoutMS=MONGO_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGO_TIMEOUT_MS,
+    )
+
+
+class UserStore:
+    """Users collection with a unique email index, pooled bcrypt and a principal cache.
+
+    A cache hit skips bcrypt but not the database: the user's stored hash is
+    read (one indexed lookup) and must match the one the principal was
+    verified against, so a changed password or a removed account stops a
+    cached login at once. The only accepted staleness is the role, which is
+    refreshed when the entry expires or the password changes.
+    """
+
+    def __init__(self, collection, hasher, workers=BCRYPT_WORKERS, queue=BCRYPT_QUEUE,
+                 ttl=PRINCIPAL_TTL, cache_size=PRINCIPAL_CACHE_SIZE):
+        self.collection = collection
+        self.hasher = hasher
+        self.ttl = ttl
+        self.cache_size = cache_size
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._cache = OrderedDict()
+        self._cache_key = os.urandom(32)
+        self._lock = threading.Lock()
+        self.indexed = False
+        self._login_times = deque(maxlen=10000)
+        self.stats_counts = {"logins": 0, "cached": 0, "failed": 0, "busy": 0}
+
+    def ensure_indexes(self):
+        # Fails loudly if existing documents already share an email. Run on first
+        # signup/login, not at startup, so an unreachable database does not slow boot
+        self.collection.create_index([("email", ASCENDING)], unique=True, name=EMAIL_INDEX)
+        index = self.collection.index_information().get(EMAIL_INDEX)
+        if not index or not index.get("unique"):
+            raise RuntimeError("users.email is not covered by a unique index")
+        self.indexed = True
+        return self
+
+    def _count(self, name):
+        with self._lock:
+            self.stats_counts[name] += 1
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            self._count("busy")
+            raise UserStoreBusy("Too many logins in progress, please try again.")
+        try:
+            return self._pool.submit(fn, *args).result(timeout=BCRYPT_TIMEOUT)
+        except FutureTimeout:
+            self._count("busy")
+            raise UserStoreBusy("Login timed out, please try again.")
+        finally:
+            self._slots.release()
+
+    def create(self, name, email, password, role):
+        # None when the email is taken; the unique index settles races between signups
+        if not self.indexed:
+            self.ensure_indexes()
+        hashed = self._run(self.hasher.generate_password_hash, password).decode("utf-8")
+        try:
+            self.collection.insert_one({"name": name, "email": email, "password": hashed, "role": role})
+        except DuplicateKeyError:
+            return None
+        return {"email": email, "role": role}
+
+    def exists(self, email):
+        return self.collection.find_one({"email": email}, {"_id": 1}) is not None
+
+    def _fingerprint(self, email, password):
+        return hmac.new(self._cache_key, f"{email}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def _cached(self, email, fingerprint):
+        with self._lock:
+            entry = self._cache.get(email)
+            if entry is None:
+                return None
+            expires, known, hashed, principal = entry
+            if expires < time.monotonic():
+                del self._cache[email]
+                return None
+            self._cache.move_to_end(email)
+        if not hmac.compare_digest(known, fingerprint):
+            return None
+        # Still the account and password this principal was checked against?
+        user = self.collection.find_one({"email": email}, {"_id": 0, "password": 1})
+        if not user or user["password"] != hashed:
+            self.forget(email)
+            return None
+        return principal
+
+    def authenticate(self, email, password):
+        """Principal dict (email, role) for valid credentials, else None."""
+        start = time.perf_counter()
+        try:
+            fingerprint = self._fingerprint(email, password)
+            principal = self._cached(email, fingerprint)
+            if principal is not None:
+                self._count("cached")
+                return principal
+
+            if not self.indexed:
+                self.ensure_indexes()
+            user = self.collection.find_one({"email": email}, {"_id": 0, "email": 1, "role": 1, "password": 1})
+            if not user or not self._run(self.hasher.check_password_hash, user["password"], password):
+                self._count("failed")
+                return None
+            principal = {"email": user["email"], "role": user.get("role")}
+            with self._lock:
+                self._cache[email] = (time.monotonic() + self.ttl, fingerprint, user["password"], principal)
+                self._cache.move_to_end(email)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+            return principal
+        finally:
+            with self._lock:
+                self.stats_counts["logins"] += 1
+                self._login_times.append(time.perf_counter() - start)
+
+    def forget(self, email):
+        with self._lock:
+            self._cache.pop(email, None)
+
+    def stats(self):
+        with self._lock:
+            times = np.asarray(self._login_times) * 1000
+            stats = dict(self.stats_counts, cached_principals=len(self._cache))
+        if len(times):
+            stats.update(login_p50_ms=round(float(np.percentile(times, 50)), 2),
+                         login_p99_ms=round(float(np.percentile(times, 99)), 2))
+        return stats
@@ -0,0 +1,17 @@
+import os
+
+# Production entrypoint:  gunicorn -c gunicorn.conf.py wsgi:app
+# The master imports this once (preload), so the dataset, cube, RFM state and
+# fitted models are built a single time and shared copy-on-write by every worker.
+os.environ.setdefault("SERVER_PRELOAD", "1")
+if os.environ.get("DASH_MOUNT_MODE", "eager") == "warm":
+    # Warm-up threads could still be building when the master forks
+    os.environ["DASH_MOUNT_MODE"] = "eager"
+os.environ.setdefault("DASH_MOUNT_MODE", "eager")
+
+if not os.environ.get("SECRET_KEY"):
+    raise RuntimeError("Set SECRET_KEY: every worker must sign sessions with the same key")
+
+from app import app  # noqa: E402
+
+application = app
@@ -0,0 +1,111 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from aggregates import SalesAggregates  # noqa: E402
+from data_store import SalesDataStore  # noqa: E402
+from generate_data import SupermartGenerator  # noqa: E402
+from sales_cube import SalesCube  # noqa: E402
+
+ROWS = 3000
+
+
+@pytest.fixture(scope="module")
+def raw():
+    df = pd.concat(SupermartGenerator(ROWS, seed=7).chunks(), ignore_index=True)
+    df["Order Date"] = df["Order Date"].dt.strftime("%m/%d/%Y")
+    return df
+
+
+@pytest.fixture(scope="module")
+def truth(raw):
+    # The same rows through plain pandas, the reference for every running total
+    df = raw.copy()
+    df["Order Date"] = pd.to_datetime(df["Order Date"], format="%m/%d/%Y")
+    df["Year"] = df["Order Date"].dt.year
+    df["Month"] = df["Order Date"].dt.month
+    return df
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["full", "compact"])
+def store(request, raw):
+    return SalesDataStore.from_frame(raw, compact=request.param)
+
+
+def test_totals_match_pandas(store, truth):
+    aggregates = store.aggregates
+    assert aggregates.rows == len(truth)
+    assert aggregates.total_sales == pytest.approx(truth["Sales"].sum(), abs=0.01)
+    assert aggregates.total_profit == pytest.approx(truth["Profit"].sum(), abs=0.01)
+    assert aggregates.avg_discount == pytest.approx(truth["Discount"].mean())
+    assert aggregates.total_orders == truth["Order ID"].nunique()
+
+
+@pytest.mark.parametrize("name, keys", [
+    ("category_sales", ["Category"]),
+    ("city_sales", ["City"]),
+    ("category_sub_sales", ["Category", "Sub Category"]),
+])
+def test_group_sums_match_pandas(store, truth, name, keys):
+    expected = truth.groupby(keys)["Sales"].sum()
+    actual = getattr(store.aggregates, name)
+    pd.testing.assert_series_equal(actual.sort_index(), expected, check_names=False, check_dtype=False,
+                                   check_index_type=False)
+
+
+def test_monthly_sales_match_pandas(store, truth):
+    expected = truth.groupby(truth["Order Date"].dt.to_period("M"))["Sales"].sum()
+    actual = store.aggregates.monthly_sales.sort_index()
+    assert actual.index.to_period("M").tolist() == expected.index.tolist()
+    np.testing.assert_allclose(actual.to_numpy(), expected.to_numpy())
+
+
+def test_chunked_updates_equal_one_pass(truth):
+    whole = SalesAggregates(truth)
+    chunked = SalesAggregates()
+    for start in range(0, len(truth), 700):
+        chunked.update(truth.iloc[start:start + 700])
+    assert chunked.rows == whole.rows
+    assert chunked.total_orders == whole.total_orders
+    pd.testing.assert_series_equal(chunked.series_monthly.sort_index(), whole.series_monthly.sort_index())
+
+
+def test_order_count_is_estimated_past_the_limit(truth):
+    aggregates = SalesAggregates(truth, order_id_limit=100)
+    assert not aggregates.orders_exact
+    assert aggregates.total_orders == pytest.approx(truth["Order ID"].nunique(), rel=0.03)
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"category": "Bakery"},
+    {"city": "Vellore", "year": 2022},
+    {"month": 3, "discount_range": [0.2, 0.3]},
+    {"discount_range": [0.15, 0.15]},
+])
+def test_cube_selection_matches_raw_rows(store, truth, filters):
+    mask = pd.Series(True, index=truth.index)
+    for key, column in [("category", "Category"), ("city", "City"), ("year", "Year"), ("month", "Month")]:
+        if key in filters:
+            mask &= truth[column] == filters[key]
+    if "discount_range" in filters:
+        mask &= truth["Discount"].round(2).between(*filters["discount_range"])
+    cells = store.cube.select(**filters)
+    assert int(cells["Orders"].sum()) == int(mask.sum())
+    assert cells["Sales"].sum() == pytest.approx(truth.loc[mask, "Sales"].sum(), abs=0.01)
+    assert cells["Profit"].sum() == pytest.approx(truth.loc[mask, "Profit"].sum(), abs=0.01)
+
+
+def test_cube_updates_equal_one_pass(store):
+    df = store.view(["Category", "City", "Year", "Month", "Weekday", "Sub Category", "Discount", "Sales", "Profit"])
+    cube = SalesCube()
+    for start in range(0, len(df), 1000):
+        cube.update(df.iloc[start:start + 1000])
+    assert int(cube.cells["Orders"].sum()) == len(df)
+    assert len(cube.cells) == len(store.cube.cells)
+    assert cube.cells["Sales"].sum() == pytest.approx(store.cube.cells["Sales"].sum())
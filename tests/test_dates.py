@@ -0,0 +1,57 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from dates import DateParser  # noqa: E402
+
+
+def test_each_shape_gets_its_own_month_first_format():
+    parser = DateParser(dayfirst=False)
+    dates = parser.parse(pd.Series(["11-08-2023", "4/15/2024", "12/01/2022"]))
+    assert dates.tolist() == [pd.Timestamp("2023-11-08"), pd.Timestamp("2024-04-15"), pd.Timestamp("2022-12-01")]
+    assert parser.report()["unparseable_rows"] == 0
+
+
+def test_one_bad_value_does_not_drop_its_shape():
+    parser = DateParser(dayfirst=False)
+    dates = parser.parse(pd.Series(["11-08-2023", "31-31-2023", "12-25-2023", "11-08-2023"]))
+    assert dates.isna().tolist() == [False, True, False, False]
+    assert parser.formats == {"99-99-9999": "%m-%d-%Y"}
+    report = parser.report()
+    assert report["unparseable_rows"] == 1
+    assert report["examples"] == ["31-31-2023"]
+
+
+def test_the_format_parsing_most_values_wins():
+    # Day first although the parser prefers month first: 13 and 25 only fit as days
+    parser = DateParser(dayfirst=False)
+    dates = parser.parse(pd.Series(["13-01-2024", "25-12-2023", "01-02-2024"]))
+    assert parser.formats == {"99-99-9999": "%d-%m-%Y"}
+    assert dates.tolist() == [pd.Timestamp("2024-01-13"), pd.Timestamp("2023-12-25"), pd.Timestamp("2024-02-01")]
+
+
+def test_ambiguous_shapes_follow_dayfirst():
+    values = pd.Series(["01-02-2024", "03-04-2024"])
+    assert DateParser(dayfirst=False).parse(values)[0] == pd.Timestamp("2024-01-02")
+    assert DateParser(dayfirst=True).parse(values)[0] == pd.Timestamp("2024-02-01")
+
+
+def test_formats_stick_across_batches():
+    parser = DateParser(dayfirst=False)
+    parser.parse(pd.Series(["11-08-2023"]))
+    # Would read as day first on its own; the shape already has a format
+    assert parser.parse(pd.Series(["13-01-2024"])).isna().all()
+
+
+def test_unreported_parse_leaves_the_counts_alone():
+    parser = DateParser()
+    assert parser.parse(pd.Series(["garbage"]), report=False).isna().all()
+    assert parser.report()["unparseable_rows"] == 0
+
+
+def test_datetimes_pass_through():
+    values = pd.Series(pd.to_datetime(["2024-01-02", "2024-03-04"]))
+    assert DateParser().parse(values).tolist() == values.tolist()
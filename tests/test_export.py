@@ -0,0 +1,60 @@
+import io
+import os
+import sys
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from data_store import SalesDataStore  # noqa: E402
+from export import register_models, stream  # noqa: E402
+from generate_data import SupermartGenerator  # noqa: E402
+from model_registry import LiveModels, ModelRegistry, ModelUnavailable  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def store():
+    return SalesDataStore.from_frame(pd.concat(SupermartGenerator(2000, seed=3).chunks(), ignore_index=True))
+
+
+def expected(store, name):
+    return getattr(store.aggregates, name).sort_index().rename("Sales").reset_index()
+
+
+def test_nothing_is_computed_until_the_first_chunk(store):
+    body = stream("series_monthly", "csv", store, chunk_rows=50)
+    assert not isinstance(body, (bytes, list))
+    assert next(body).startswith(b"Category,Sub Category,City,Month,Sales\n")
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 100_000])
+def test_csv_export_matches_the_aggregate(store, chunk_rows):
+    body = b"".join(stream("category_sub_sales", "csv", store, chunk_rows=chunk_rows))
+    exported = pd.read_csv(io.BytesIO(body))
+    pd.testing.assert_frame_equal(exported, expected(store, "category_sub_sales"), check_dtype=False)
+
+
+def test_parquet_export_matches_the_aggregate(store):
+    body = b"".join(stream("series_monthly", "parquet", store, chunk_rows=64))
+    table = pq.read_table(io.BytesIO(body))
+    assert table.num_rows == len(store.aggregates.series_monthly)
+    exported = table.to_pandas()
+    want = expected(store, "series_monthly")
+    assert exported["Sales"].sum() == pytest.approx(want["Sales"].sum())
+    assert exported[["Category", "Sub Category", "City"]].astype(str).values.tolist() == \
+        want[["Category", "Sub Category", "City"]].astype(str).values.tolist()
+
+
+def test_forecasts_need_fitted_models(store, tmp_path):
+    # The web export never fits: with an empty registry it fails before any bytes are sent
+    models = register_models(LiveModels(ModelRegistry(str(tmp_path)), store_getter=lambda: store), store)
+    with pytest.raises(ModelUnavailable):
+        stream("forecasts", "csv", store, models)
+    assert not os.listdir(tmp_path)
+
+
+def test_unknown_format_is_rejected(store):
+    with pytest.raises(ValueError, match="Unknown format"):
+        stream("city_sales", "xlsx", store)
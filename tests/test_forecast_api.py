@@ -0,0 +1,49 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from forecast_api import ALL_CITIES, API_HORIZON, ForecastIndex, parse_keys  # noqa: E402
+
+
+def test_scalar_category_is_one_key():
+    keys = parse_keys({"category": "Bakery", "sub_category": "Cakes", "horizon": 2})
+    assert keys["category"] == ["Bakery"]
+    assert keys["sub_category"] == ["Cakes"]
+    assert keys["city"] == [ALL_CITIES]
+    assert keys["horizon"].tolist() == [2]
+
+
+def test_column_payload_broadcasts_scalars():
+    keys = parse_keys({"category": ["Bakery", "Snacks"], "sub_category": ["Cakes", "Chocolates"], "city": "Vellore"})
+    assert keys["category"] == ["Bakery", "Snacks"]
+    assert keys["city"] == ["Vellore", "Vellore"]
+    assert keys["horizon"].tolist() == [API_HORIZON, API_HORIZON]
+
+
+def test_mismatched_columns_are_rejected():
+    with pytest.raises(ValueError):
+        parse_keys({"category": ["Bakery", "Snacks"], "sub_category": ["Cakes"]})
+
+
+@pytest.mark.parametrize("horizon", [None, "x", 2.5, 0, API_HORIZON + 1, True, {"months": 2}])
+def test_bad_horizon_is_a_clear_error(horizon):
+    with pytest.raises(ValueError, match="horizon must be a whole number"):
+        parse_keys({"category": "Bakery", "sub_category": "Cakes", "horizon": horizon})
+
+
+def test_query_string_horizon_is_parsed():
+    assert parse_keys({"category": "Bakery", "sub_category": "Cakes", "horizon": "3"})["horizon"].tolist() == [3]
+
+
+def test_forecasts_are_clipped_at_zero():
+    months = pd.period_range("2019-01", periods=2, freq="M")
+    index = pd.MultiIndex.from_tuples([("Bakery", "Cakes", "Vellore"), ("Bakery", "Cakes", "Salem")],
+                                      names=["Category", "Sub Category", "City"])
+    forecast = pd.DataFrame([[-327.4, 10.0], [5.0, -1.0]], index=index, columns=months)
+    table = ForecastIndex(forecast)
+    rows = table.lookup(["Bakery", "Bakery"], ["Cakes", "Cakes"], ["Vellore", ALL_CITIES])
+    assert table.values[rows].tolist() == [[0.0, 10.0], [5.0, 10.0]]
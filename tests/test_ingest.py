@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from data_store import SalesDataStore  # noqa: E402
+from generate_data import SupermartGenerator  # noqa: E402
+from ingest import FileIngestor, drop_orders  # noqa: E402
+
+
+def orders(rows, seed=0):
+    # Raw rows as they arrive: month-first date strings, OD-prefixed ids
+    generator = SupermartGenerator(rows, seed=seed)
+    df = pd.concat(generator.chunks(), ignore_index=True)
+    df["Order Date"] = df["Order Date"].dt.strftime("%m/%d/%Y")
+    return df
+
+
+@pytest.fixture(params=[False, True], ids=["full", "compact"])
+def store(request):
+    return SalesDataStore.from_frame(orders(500), compact=request.param)
+
+
+def state(store):
+    aggregates = store.aggregates
+    return (store.version, store.data_version, aggregates.rows, aggregates.total_sales,
+            int(store.cube.cells["Orders"].sum()), len(store.view(["Sales"])))
+
+
+def test_append_updates_every_view(store):
+    before = state(store)
+    batch = orders(40, seed=1)
+    assert store.append(batch) == 40
+    version, data_version, rows, sales, cube_orders, view_rows = state(store)
+    assert version == before[0] + 1
+    assert data_version != before[1]
+    assert rows == cube_orders == view_rows == 540
+    assert sales == pytest.approx(before[3] + batch["Sales"].sum())
+
+
+@pytest.mark.parametrize("column, value, message", [
+    ("Order Date", "garbage", "Order Date"),
+    ("Sales", "a lot", "Sales"),
+])
+def test_bad_batch_is_rejected_whole(store, column, value, message):
+    before = state(store)
+    batch = orders(5, seed=1)
+    batch[column] = batch[column].astype(object)
+    batch.loc[3, column] = value
+    with pytest.raises(ValueError, match=f"'{message}'.* row 3 "):
+        store.append(batch)
+    assert state(store) == before
+
+
+def test_missing_columns_are_a_key_error(store):
+    with pytest.raises(KeyError, match="Region"):
+        store.validate(orders(5).drop(columns="Region"))
+
+
+def test_compact_order_ids_are_checked_up_front():
+    store = SalesDataStore.from_frame(orders(100), compact=True)
+    batch = orders(3, seed=1)
+    batch.loc[1, "Order ID"] = "ORD7"
+    with pytest.raises(ValueError, match="'Order ID'.* row 1 "):
+        store.validate(batch)
+    # The full store keeps ids as text, so the same batch is fine there
+    assert SalesDataStore.from_frame(orders(100), compact=False).append(batch) == 3
+
+
+def test_dropped_orders_reach_the_ingestor(tmp_path, store):
+    drop_orders(orders(10, seed=1), str(tmp_path))
+    ingestor = FileIngestor(store, str(tmp_path))
+    assert ingestor.poll() == 10
+    # Only the bytes written since the last poll are read
+    assert ingestor.poll() == 0
+    drop_orders(orders(5, seed=2), str(tmp_path))
+    assert ingestor.poll() == 5
+    assert store.aggregates.rows == 515
+
+
+def test_half_written_line_waits_for_the_next_poll(tmp_path, store):
+    rows = orders(2, seed=1).to_dict(orient="records")
+    path = tmp_path / "orders.jsonl"
+    line = json.dumps(rows[1])
+    path.write_text(json.dumps(rows[0]) + "\n" + line[:20])
+    ingestor = FileIngestor(store, str(tmp_path))
+    assert ingestor.poll() == 1
+    with open(path, "a") as f:
+        f.write(line[20:] + "\n")
+    assert ingestor.poll() == 1
+
+
+def test_bad_file_does_not_block_the_others(tmp_path, store):
+    bad = orders(3, seed=1)
+    bad.loc[0, "Order Date"] = "garbage"
+    bad.to_json(tmp_path / "a.jsonl", orient="records", lines=True)
+    (tmp_path / "b.jsonl").write_text("{not json\n")
+    orders(4, seed=2).to_csv(tmp_path / "c.csv", index=False)
+    ingestor = FileIngestor(store, str(tmp_path))
+    assert ingestor.poll() == 4
+    assert ingestor.rows_rejected == 3
+    # Skipped, not retried on every poll
+    assert ingestor.poll() == 0
+    with open(tmp_path / "a.jsonl", "a") as f:
+        f.write(orders(2, seed=3).to_json(orient="records", lines=True))
+    assert ingestor.poll() == 2
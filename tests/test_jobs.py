@@ -0,0 +1,62 @@
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(__file__), "..", "src")
+sys.path.insert(0, SRC)
+
+from generate_data import SupermartGenerator, write_csv  # noqa: E402
+from jobs import ACTIVE, DONE, JobQueue  # noqa: E402
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite"))
+
+
+def test_submit_is_deduplicated_until_the_result_expires(queue):
+    first = queue.submit("math:sqrt", 4)
+    assert queue.submit("math:sqrt", 4) == first
+    assert queue.submit("math:sqrt", 9) != first
+    assert queue.get(first)["status"] == "queued"
+
+
+def test_cancel_drops_a_queued_job(queue):
+    job_id = queue.submit("math:sqrt", 4)
+    queue.cancel(job_id)
+    assert queue.get(job_id)["status"] == "cancelled"
+    assert queue.claim(os.getpid()) is None
+
+
+def wait(queue, job_id, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] not in ACTIVE:
+            return job
+        time.sleep(0.5)
+    raise AssertionError(f"job {job_id} still {job['status']} after {timeout}s")
+
+
+def test_refit_job_can_use_a_process_pool(tmp_path):
+    # Job workers must be allowed children: the series forecasts fit across FORECAST_WORKERS processes
+    data = str(tmp_path / "orders.csv")
+    for _ in write_csv(SupermartGenerator(3000, seed=1), data):
+        pass
+    db = str(tmp_path / "jobs.sqlite")
+    env = dict(os.environ, SUPERMART_DATA=data, MODEL_REGISTRY=str(tmp_path / "models"), JOB_DB=db,
+               FORECAST_WORKERS="2", FORECAST_CHUNKSIZE="8", SUPERMART_SNAPSHOT="0", SUPERMART_INGEST_DIR="")
+    worker = subprocess.Popen([sys.executable, "jobs.py", "--workers", "1", "--db", db], cwd=SRC, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        queue = JobQueue(db)
+        job = wait(queue, queue.submit("pipeline:refit_models"), timeout=600)
+    finally:
+        worker.terminate()
+        worker.wait(30)
+    assert job["status"] == DONE, job["error"]
+    assert "series_hw" in job["result"]
+    assert os.listdir(tmp_path / "models" / "series_hw")